@@ -0,0 +1,148 @@
+""" Content-addressed cache of tool products, shared between experiments """
+
+import hashlib
+import os
+import pathlib
+import shutil
+import tempfile
+
+CACHE_DIR_ENV = "BFASST_CACHE_DIR"
+CACHE_SIZE_ENV = "BFASST_CACHE_SIZE_GB"
+DEFAULT_CACHE_SIZE_GB = 50
+
+# When the cache is evicted, it's shrunk to this fraction of its maximum size, so it isn't
+# scanned again for a while
+EVICTION_TARGET = 0.9
+
+# Caches returned by get_artifact_cache(), by (directory, size)
+CACHES = {}
+
+
+class ArtifactCache:
+    """A directory of tool products, keyed by the tool and the fingerprint of its inputs
+    (see Tool.fingerprint()), so that a tool that already ran on the same inputs with the same
+    arguments, in any experiment, doesn't need to run again.
+
+    Each entry is a directory holding the products of one tool run.  Entries are created
+    atomically (renamed into place), so the directory can be shared by concurrent runs and
+    machines.  When the cache grows past max_size_bytes, the least recently used entries are
+    evicted.
+
+    The size of the cache is only scanned when it's first needed and when evicting; in between,
+    the size of each stored entry is added to a running total.  Entries stored by other
+    processes are only counted at the next scan."""
+
+    def __init__(self, cache_dir, max_size_bytes):
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.max_size_bytes = max_size_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.size_bytes = None
+
+    @staticmethod
+    def key(tool_name, digest, paths):
+        """Key of the products at paths, made by tool_name from inputs with the given digest"""
+        text = "\n".join([tool_name, digest] + [path.name for path in paths])
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def _entry_dir(self, key):
+        return self.cache_dir / key[:2] / key
+
+    @staticmethod
+    def _entry_file_name(index, path):
+        return f"{index}-{path.name}"
+
+    def restore(self, key, paths, copy_paths=()):
+        """Restore the cached products to paths, and return whether the entry was found.
+        Products are hardlinked from the cache (or copied, if that's not possible), except
+        those in copy_paths, which are always copied, as they are modified after the tool runs
+        (eg. the tool log)."""
+        entry_dir = self._entry_dir(key)
+        if not entry_dir.is_dir():
+            return False
+
+        try:
+            for i, path in enumerate(paths):
+                cached_path = entry_dir / self._entry_file_name(i, path)
+                path.unlink(missing_ok=True)
+                if path in copy_paths:
+                    shutil.copy2(cached_path, path)
+                    continue
+                try:
+                    os.link(cached_path, path)
+                except OSError:
+                    # Eg. the cache is on a different file system
+                    shutil.copy2(cached_path, path)
+        except FileNotFoundError:
+            # Entry was evicted while restoring it
+            for path in paths:
+                path.unlink(missing_ok=True)
+            return False
+
+        # Mark the entry as recently used
+        os.utime(entry_dir)
+        return True
+
+    def store(self, key, paths):
+        """Copy the products at paths into the cache, then evict old entries if needed"""
+        entry_dir = self._entry_dir(key)
+        if entry_dir.is_dir():
+            os.utime(entry_dir)
+            return
+
+        if self.size_bytes is None:
+            self.evict()
+
+        entry_dir.parent.mkdir(exist_ok=True)
+        tmp_dir = pathlib.Path(tempfile.mkdtemp(dir=entry_dir.parent, prefix=".tmp-"))
+        for i, path in enumerate(paths):
+            shutil.copy2(path, tmp_dir / self._entry_file_name(i, path))
+        try:
+            tmp_dir.rename(entry_dir)
+        except OSError:
+            # Another process stored the same entry first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+
+        self.size_bytes += sum(path.stat().st_size for path in paths)
+        if self.size_bytes > self.max_size_bytes:
+            self.evict()
+
+    def evict(self):
+        """Scan the cache, and if it doesn't fit in max_size_bytes, remove the least recently used
+        entries until it fits in EVICTION_TARGET of it"""
+        entries = []
+        total_size = 0
+        for entry_dir in self.cache_dir.glob("*/*"):
+            if entry_dir.name.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(path.stat().st_size for path in entry_dir.iterdir())
+                entries.append((entry_dir.stat().st_mtime, size, entry_dir))
+            except FileNotFoundError:
+                # Evicted by another process
+                continue
+            total_size += size
+
+        entries.sort()
+        target_size = self.max_size_bytes
+        if total_size > self.max_size_bytes:
+            target_size = int(self.max_size_bytes * EVICTION_TARGET)
+        for _, size, entry_dir in entries:
+            if total_size <= target_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
+        self.size_bytes = total_size
+
+
+def get_artifact_cache():
+    """Return the artifact cache configured by the BFASST_CACHE_DIR (and BFASST_CACHE_SIZE_GB)
+    environment variables, or None if caching is disabled.  The same cache object is returned
+    for the same configuration, so its running size total is kept between tool runs."""
+    if CACHE_DIR_ENV not in os.environ:
+        return None
+    size_gb = float(os.environ.get(CACHE_SIZE_ENV, DEFAULT_CACHE_SIZE_GB))
+    config = (os.environ[CACHE_DIR_ENV], int(size_gb * 1024**3))
+    if config not in CACHES:
+        CACHES[config] = ArtifactCache(*config)
+    return CACHES[config]
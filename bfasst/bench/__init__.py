@@ -0,0 +1 @@
+""" Benchmarks of bfasst's own (Python) netlist processing, see scripts/run_bench.py """
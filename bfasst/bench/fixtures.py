@@ -0,0 +1,41 @@
+""" Netlist pairs that the benchmarks run on """
+
+from dataclasses import dataclass
+import pathlib
+
+from bfasst import paths
+
+NETLIST_EXAMPLES_PATH = paths.DESIGNS_PATH / "netlist_examples"
+
+
+@dataclass
+class NetlistPair:
+    """A golden netlist, and the netlist reversed from its bitstream"""
+
+    name: str
+    golden_netlist: pathlib.Path
+    reversed_netlist: pathlib.Path
+
+    # Golden netlist made of the same Xilinx primitives (LUT6_2, etc.) as the reversed netlist,
+    # as compared by the StructuralCompareTool.  If there isn't one, the structural_compare stage
+    # is skipped.
+    structural_golden_netlist: pathlib.Path = None
+
+
+def find_netlist_pairs(directory=NETLIST_EXAMPLES_PATH):
+    """Netlist pairs in a directory, named <name>_reversed.v and <name>_impl.v, and/or
+    <name>_physical.v (a structural golden netlist, as written by generate_netlist_pair)"""
+    pairs = []
+    for reversed_netlist in sorted(directory.glob("*_reversed.v")):
+        name = reversed_netlist.name[: -len("_reversed.v")]
+        golden_netlist = directory / f"{name}_impl.v"
+        structural_golden_netlist = directory / f"{name}_physical.v"
+        if not structural_golden_netlist.is_file():
+            structural_golden_netlist = None
+        if not golden_netlist.is_file():
+            golden_netlist = structural_golden_netlist
+        if golden_netlist:
+            pairs.append(
+                NetlistPair(name, golden_netlist, reversed_netlist, structural_golden_netlist)
+            )
+    return pairs
@@ -0,0 +1,110 @@
+""" Runs the benchmark stages, and compares their results with a baseline """
+
+import contextlib
+from dataclasses import asdict, dataclass
+import gc
+import json
+import pathlib
+import random
+import tempfile
+import tracemalloc
+
+from bfasst import metrics
+from bfasst.bench.stages import STAGES, StageContext, StageSkipped
+from bfasst.tool import BfasstException
+
+# Measurements compared with the baseline
+COMPARED_MEASUREMENTS = ("wall", "peak_alloc_kb")
+
+# Status of a stage that was skipped, followed by the reason
+SKIPPED = "skipped"
+
+
+@dataclass
+class StageResult:
+    """Measurements of a stage run on a netlist pair"""
+
+    fixture: str
+    stage: str
+    status: str  # Empty string on success, or starts with SKIPPED
+    wall: float = None  # Seconds, of the fastest repeat
+    cpu: float = None  # Seconds, of the fastest repeat
+    peak_alloc_kb: float = None  # Peak memory allocated by Python in the stage (tracemalloc)
+
+    @property
+    def key(self):
+        return (self.fixture, self.stage)
+
+    @property
+    def skipped(self):
+        return self.status.startswith(SKIPPED)
+
+
+@contextlib.contextmanager
+def _stage_context(pair, seed):
+    with tempfile.TemporaryDirectory(prefix="bfasst_bench_") as work_dir:
+        yield StageContext(pair, pathlib.Path(work_dir), random.Random(seed))
+
+
+def run_stage(stage, pair, seed=0, repeat=5):
+    """Run a stage on a netlist pair repeat times, keeping the fastest time, then once more
+    under tracemalloc (which slows it down) to measure its memory use"""
+    records = []
+    try:
+        for _ in range(repeat):
+            with _stage_context(pair, seed) as ctx:
+                run = STAGES[stage](ctx)
+                # Don't time the collection of the setup's (or previous run's) garbage
+                gc.collect()
+                metrics.start_job()
+                with metrics.phase(stage) as record:
+                    run()
+                records.append(record)
+
+        with _stage_context(pair, seed) as ctx:
+            run = STAGES[stage](ctx)
+            gc.collect()
+            tracemalloc.start()
+            try:
+                run()
+                _, peak_alloc = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    except StageSkipped as e:
+        return StageResult(pair.name, stage, f"{SKIPPED}: {e}")
+    except (BfasstException, AssertionError) as e:
+        return StageResult(pair.name, stage, f"{type(e).__name__}: {e}")
+
+    fastest = min(records, key=lambda record: record["wall"])
+    return StageResult(
+        pair.name,
+        stage,
+        "",
+        fastest["wall"],
+        fastest["cpu"],
+        peak_alloc / 1024,
+    )
+
+
+def save_results(results, path):
+    with open(path, "w") as fp:
+        json.dump([asdict(result) for result in results], fp, indent=2)
+
+
+def load_results(path):
+    """Load saved results, by (fixture, stage)"""
+    with open(path) as fp:
+        results = [StageResult(**result) for result in json.load(fp)]
+    return {result.key: result for result in results}
+
+
+def regressions(result, baseline_result, tolerance):
+    """Measurements of a result that are worse than the baseline by more than tolerance (a
+    fraction of the baseline)"""
+    if result.status or baseline_result.status:
+        return []
+    return [
+        measurement
+        for measurement in COMPARED_MEASUREMENTS
+        if getattr(result, measurement) > getattr(baseline_result, measurement) * (1 + tolerance)
+    ]
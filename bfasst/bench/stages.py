@@ -0,0 +1,156 @@
+""" The benchmarked stages.  Each stage function does the stage's setup (parsing netlists, etc.)
+and returns a function that runs the stage itself, which is what is measured. """
+
+from dataclasses import dataclass
+import functools
+import pathlib
+import random
+import shutil
+import types
+
+import spydrnet as sdn
+
+from bfasst.bench.fixtures import NetlistPair
+from bfasst.netlist_mapping.ccl_mapping import map_libraries
+from bfasst.netlist_mapping.functional.qm import qm_f
+from bfasst.netlist_mapping.functional_mapping import functionally_map_libraries
+from bfasst.netlist_mapping.structural_mapping import structurally_map_libraries
+from bfasst.tool import BfasstException
+from bfasst.utils import convert_verilog_literal_to_int
+
+
+class StageSkipped(BfasstException):
+    """Raised by a stage's setup when the netlist pair doesn't have what the stage needs"""
+
+
+@dataclass
+class StageContext:
+    """What a stage runs on"""
+
+    pair: NetlistPair
+    work_dir: pathlib.Path  # Empty directory for any files the stage writes
+    rng: random.Random  # Seeded, so that stages making random choices repeat them
+
+
+def _parse(path):
+    return sdn.parse(str(path))
+
+
+def qm_minimization(ctx):
+    """Quine-McCluskey minimization (qm_f) of the truth table of each LUT in both netlists"""
+    truth_tables = [
+        _lut_truth_table(instance)
+        for path in (ctx.pair.golden_netlist, ctx.pair.reversed_netlist)
+        for instance in _parse(path).get_instances()
+        if instance.reference.name.startswith("LUT")
+    ]
+
+    def run():
+        for ones, zeros in truth_tables:
+            qm_f(ones=ones, zeros=zeros)
+
+    return run
+
+
+def _lut_truth_table(instance):
+    """Minterms and maxterms of a LUT, from its INIT property"""
+    init = instance.data["VERILOG.Parameters"]["INIT"].lower()
+    size = int(init.split("'")[0])
+    value = convert_verilog_literal_to_int(init)
+    ones = [i for i in range(size) if value >> i & 1]
+    zeros = [i for i in range(size) if not value >> i & 1]
+    return ones, zeros
+
+
+def functional_mapping(ctx):
+    """Functional mapping of the flipflops of the golden and reversed netlists"""
+    return functools.partial(
+        functionally_map_libraries,
+        _parse(ctx.pair.golden_netlist).libraries[0],
+        _parse(ctx.pair.reversed_netlist).libraries[0],
+    )
+
+
+def ccl_mapping(ctx):
+    """Block chain and functional mapping of the flipflops of the golden and reversed
+    netlists"""
+    return functools.partial(
+        map_libraries,
+        _parse(ctx.pair.golden_netlist).libraries[0],
+        _parse(ctx.pair.reversed_netlist).libraries[0],
+    )
+
+
+def block_mapping(ctx):
+    """Automated block mapping of the golden and reversed netlists"""
+    return functools.partial(
+        structurally_map_libraries,
+        _parse(ctx.pair.golden_netlist).libraries[0],
+        _parse(ctx.pair.reversed_netlist).libraries[0],
+    )
+
+
+def build_nets(ctx):
+    """Building the nets of the reversed netlist, as the StructuralCompareTool does"""
+    tool = _structural_compare_tool(ctx, ctx.pair.reversed_netlist)
+    netlist = tool.get_netlist(_parse(ctx.pair.reversed_netlist).libraries[0])
+
+    return netlist.build_nets
+
+
+def structural_compare(ctx):
+    """StructuralCompareTool mapping, and verification, of the (structural) golden netlist and
+    the reversed netlist"""
+    if ctx.pair.structural_golden_netlist is None:
+        raise StageSkipped("no structural golden netlist")
+    tool = _structural_compare_tool(ctx, ctx.pair.structural_golden_netlist)
+    tool.named_netlist = tool.get_netlist(_parse(tool.gold_netlist).libraries[0])
+    tool.reversed_netlist = tool.get_netlist(_parse(tool.rev_netlist).libraries[0])
+
+    def run():
+        tool.perform_mapping()
+        tool.verify_equivalence()
+
+    return run
+
+
+def _structural_compare_tool(ctx, golden_netlist):
+    # Importing the tool starts the JVM for RapidWright, which only some stages need
+    # pylint: disable=import-outside-toplevel
+    from bfasst.compare.structural import StructuralCompareTool
+
+    return StructuralCompareTool(ctx.work_dir, None, golden_netlist, ctx.pair.reversed_netlist)
+
+
+def error_injection(ctx):
+    """ErrorInjector bit flip and wire swap in the reversed netlist"""
+    # Importing the tool starts the JVM for RapidWright, which only some stages need
+    # pylint: disable=import-outside-toplevel
+    from bfasst.transform.error_injector import ErrorInjector
+
+    # The injector reads <top>_reversed.v from its directory, and writes the corrupted
+    # netlists to the design's directory
+    design = types.SimpleNamespace(top=ctx.pair.name, path=ctx.work_dir)
+    shutil.copy(ctx.pair.reversed_netlist, ctx.work_dir / f"{design.top}_reversed.v")
+    injector = ErrorInjector(ctx.work_dir, design, 0, ctx.rng)
+
+    def run():
+        injector.inject_bit_flip()
+        injector.inject_wire_swap()
+
+    return run
+
+
+# Stage name -> stage function, in the order they are run
+STAGES = {
+    "qm": qm_minimization,
+    "functional_mapping": functional_mapping,
+    "ccl_mapping": ccl_mapping,
+    "block_mapping": block_mapping,
+    "build_nets": build_nets,
+    "structural_compare": structural_compare,
+    "error_injection": error_injection,
+}
+
+# Stages that need RapidWright (but none of the vendor tools)
+RAPIDWRIGHT_STAGES = ("build_nets", "structural_compare", "error_injection")
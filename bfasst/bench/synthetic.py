@@ -0,0 +1,319 @@
+""" Generates large netlist pairs, made of Xilinx primitives, for scaling benchmarks """
+
+from array import array
+import random
+
+from bfasst.bench.fixtures import NetlistPair
+
+# Fraction of the cells of each type
+DEFAULT_MIX = {"LUT6_2": 0.6, "FDRE": 0.3, "CARRY4": 0.05, "RAM32M": 0.045, "RAMB36E1": 0.005}
+
+# How a cell's port is connected
+DATA = "data"  # To a net driven by an earlier cell (see MAX_LUT_DEPTH), or a top-level input
+FF_DATA = "ff_data"  # To a LUT output that no other flipflop is connected to (to tell them apart)
+CLOCK = "clock"
+ZERO = "zero"
+ONE = "one"
+CARRY_IN = "carry_in"  # To the previous CARRY4 in the chain, or ZERO at the start of a chain
+OUTPUT = "output"
+
+
+def _bus(name, width, kind):
+    return (name, width, kind)
+
+
+# Ports of each cell type: (name, width, how it is connected)
+PORTS = {
+    "LUT6_2": tuple(_bus(f"I{i}", 1, DATA) for i in range(6))
+    + (_bus("O5", 1, OUTPUT), _bus("O6", 1, OUTPUT)),
+    "FDRE": (
+        _bus("C", 1, CLOCK),
+        _bus("CE", 1, ONE),
+        _bus("D", 1, FF_DATA),
+        _bus("Q", 1, OUTPUT),
+        _bus("R", 1, ZERO),
+    ),
+    "CARRY4": (
+        _bus("CI", 1, CARRY_IN),
+        _bus("CO", 4, OUTPUT),
+        _bus("CYINIT", 1, ZERO),
+        _bus("DI", 4, DATA),
+        _bus("O", 4, OUTPUT),
+        _bus("S", 4, DATA),
+    ),
+    "RAM32M": tuple(_bus(f"ADDR{x}", 5, DATA) for x in "ABCD")
+    + tuple(_bus(f"DI{x}", 2, DATA) for x in "ABCD")
+    + tuple(_bus(f"DO{x}", 2, OUTPUT) for x in "ABCD")
+    + (_bus("WCLK", 1, CLOCK), _bus("WE", 1, DATA)),
+    "RAMB36E1": (
+        _bus("ADDRARDADDR", 16, DATA),
+        _bus("ADDRBWRADDR", 16, DATA),
+        _bus("CLKARDCLK", 1, CLOCK),
+        _bus("CLKBWRCLK", 1, CLOCK),
+        _bus("DIADI", 32, DATA),
+        _bus("DIBDI", 32, DATA),
+        _bus("DOADO", 32, OUTPUT),
+        _bus("DOBDO", 32, OUTPUT),
+        _bus("ENARDEN", 1, ONE),
+        _bus("ENBWREN", 1, ONE),
+        _bus("REGCEAREGCE", 1, ONE),
+        _bus("REGCEB", 1, ONE),
+        _bus("RSTRAMARSTRAM", 1, ZERO),
+        _bus("RSTRAMB", 1, ZERO),
+        _bus("RSTREGARSTREG", 1, ZERO),
+        _bus("RSTREGB", 1, ZERO),
+        _bus("WEA", 4, DATA),
+        _bus("WEBWE", 8, DATA),
+    ),
+}
+CELL_TYPES = tuple(PORTS)
+LUT = CELL_TYPES.index("LUT6_2")
+
+# Longest chain of CARRY4s
+CARRY_CHAIN_LENGTH = 8
+
+# Most LUTs between flipflops (or other cells, or top-level ports), as the logic of real designs
+# is pipelined.  The mappers trace each flipflop's input through its LUTs, so deeper logic makes
+# them exponentially slower.
+MAX_LUT_DEPTH = 2
+
+# Nets with fixed ids, followed by the outputs of the top-level inputs' IBUFs, then the cells'
+# outputs
+ZERO_NET = 0
+ONE_NET = 1
+CLOCK_NET = 2
+FIRST_INPUT_NET = 3
+FIXED_NETS = {CLOCK: CLOCK_NET, ZERO: ZERO_NET, ONE: ONE_NET}
+
+
+class SyntheticNetlist:
+    """A random netlist of Xilinx primitives (see PORTS), connected as a DAG from the top-level
+    inputs (through IBUFs, and to the top-level outputs through OBUFs), which can be written as
+    a golden netlist, and as a reversed netlist with the cells in a different order, and the
+    cells and nets renamed.
+
+    LUTs share their INIT among a pool of functions, so that mapping has to tell them apart by
+    their connections.  The netlist is kept in flat arrays, so that it can have millions of
+    cells."""
+
+    def __init__(self, num_cells, seed=0, mix=None, top="top"):
+        self.top = top
+        self.rng = random.Random(seed)
+        mix = mix or DEFAULT_MIX
+
+        # Cell type (index in CELL_TYPES) of each cell, in random order
+        counts = {cell_type: int(num_cells * mix.get(cell_type, 0)) for cell_type in CELL_TYPES}
+        counts["LUT6_2"] += num_cells - sum(counts.values())
+        self.cell_types = bytearray()
+        for type_idx, cell_type in enumerate(CELL_TYPES):
+            self.cell_types.extend([type_idx] * counts[cell_type])
+        self.rng.shuffle(self.cell_types)
+
+        self.num_ports = max(8, min(1024, num_cells // 64))
+
+        # Net ids of each cell's connections (in PORTS order), and where each cell's start
+        self.connections = array("q")
+        self.first_connection = array("q", [0])
+        # Seed (LUT6_2: index in the INIT pool, FDRE: INIT) of each cell's properties
+        self.params = array("q")
+        self.lut_inits = [self.rng.getrandbits(64) for _ in range(max(16, counts["LUT6_2"] // 4))]
+
+        self.num_nets = FIRST_INPUT_NET + self.num_ports
+        self._connect_cells()
+
+        # Net driving each top-level output (through an OBUF)
+        cell_nets = range(FIRST_INPUT_NET + self.num_ports, self.num_nets)
+        self.output_nets = self.rng.sample(cell_nets, min(self.num_ports, len(cell_nets)))
+
+        # Order of the cells, and names (numbers) of the nets, in the reversed netlist
+        self.reversed_order = array("q", range(num_cells))
+        self.rng.shuffle(self.reversed_order)
+        self.reversed_net_numbers = array("q", range(self.num_nets))
+        self.rng.shuffle(self.reversed_net_numbers)
+
+    def _connect_cells(self):
+        # LUTs between each net and the flipflops, other cells or top-level inputs driving it
+        lut_depths = bytearray(self.num_nets)
+        # Nets that a DATA input can be connected to, without exceeding MAX_LUT_DEPTH
+        data_nets = array("q", range(FIRST_INPUT_NET, self.num_nets))
+        # LUT outputs that no flipflop's D input is connected to yet
+        ff_data_nets = array("q")
+        # Net to connect the next CARRY4's CI to, and how many CARRY4s have been chained
+        carry_out = ZERO_NET
+        carry_chain_length = 0
+        for cell, type_idx in enumerate(self.cell_types):
+            cell_type = CELL_TYPES[type_idx]
+            if cell_type == "FDRE" and not ff_data_nets:
+                # Flipflops are driven by LUTs, so bring the next LUT forward
+                cell_type = self._bring_lut_forward(cell)
+
+            input_depth = 0
+            for _, width, kind in PORTS[cell_type]:
+                for _ in range(width):
+                    if kind == DATA or (kind == FF_DATA and not ff_data_nets):
+                        net = data_nets[self.rng.randrange(len(data_nets))]
+                        input_depth = max(input_depth, lut_depths[net])
+                    elif kind == FF_DATA:
+                        net = self._pop_random(ff_data_nets)
+                    elif kind == CARRY_IN:
+                        net = carry_out
+                    elif kind == OUTPUT:
+                        net = self.num_nets
+                        self.num_nets += 1
+                        # Only LUT outputs are deeper than their inputs
+                        depth = input_depth + 1 if cell_type == "LUT6_2" else 0
+                        lut_depths.append(depth)
+                        if depth < MAX_LUT_DEPTH:
+                            data_nets.append(net)
+                        if cell_type == "LUT6_2":
+                            ff_data_nets.append(net)
+                    else:
+                        net = FIXED_NETS[kind]
+                    self.connections.append(net)
+            if cell_type == "CARRY4":
+                # CO[3] (bits are in order from bit 0, after CI), until the chain is long enough
+                carry_chain_length += 1
+                carry_out = (
+                    self.connections[self.first_connection[-1] + 4]
+                    if carry_chain_length % CARRY_CHAIN_LENGTH
+                    else ZERO_NET
+                )
+            self.first_connection.append(len(self.connections))
+            self.params.append(self._random_param(cell_type))
+
+    def _bring_lut_forward(self, cell):
+        """Swap the next LUT (if there is one) with a cell, returning the cell's new type"""
+        try:
+            lut = self.cell_types.index(LUT, cell)
+        except ValueError:
+            return CELL_TYPES[self.cell_types[cell]]
+        self.cell_types[cell], self.cell_types[lut] = LUT, self.cell_types[cell]
+        return "LUT6_2"
+
+    def _random_param(self, cell_type):
+        if cell_type == "LUT6_2":
+            return self.rng.randrange(len(self.lut_inits))
+        if cell_type == "FDRE":
+            return self.rng.getrandbits(1)
+        return self.rng.getrandbits(63)
+
+    def _pop_random(self, nets):
+        """Remove a random net from an array of nets, and return it"""
+        i = self.rng.randrange(len(nets))
+        net = nets[i]
+        nets[i] = nets[-1]
+        nets.pop()
+        return net
+
+    def write_golden(self, path):
+        """Write the netlist with the cells in order, as in a netlist written by Vivado"""
+
+        def net_name(net):
+            return self._constant_net_name(net) or f"n{net}"
+
+        with open(path, "w") as fp:
+            self._write_header(fp, net_name, "din_IBUF_inst")
+            for i, net in enumerate(self.output_nets):
+                fp.write(f"  OBUF dout_OBUF_inst_{i} (.I({net_name(net)}), .O(dout[{i}]));\n")
+            for cell, cell_type in enumerate(self.cell_types):
+                fp.write(
+                    self._cell_verilog(cell, f"{CELL_TYPES[cell_type].lower()}_{cell}", net_name)
+                )
+            fp.write("endmodule\n")
+
+    def write_reversed(self, path):
+        """Write the netlist with the cells in a different order, the cells and nets renamed,
+        and the top-level outputs driven through assign statements, as in a netlist reversed
+        from a bitstream"""
+
+        def net_name(net):
+            return self._constant_net_name(net) or f"w{self.reversed_net_numbers[net]}"
+
+        with open(path, "w") as fp:
+            self._write_header(fp, net_name, "IOB_IN")
+            fp.write(f"  wire [{self.num_ports - 1}:0] dout_obuf;\n")
+            for i, net in enumerate(self.output_nets):
+                fp.write(f"  OBUF IOB_OUT_{i} (.I({net_name(net)}), .O(dout_obuf[{i}]));\n")
+                fp.write(f"  assign dout[{i}] = dout_obuf[{i}];\n")
+            for position, cell in enumerate(self.reversed_order):
+                fp.write(self._cell_verilog(cell, f"cell_{position}", net_name))
+            fp.write("endmodule\n")
+
+    @staticmethod
+    def _constant_net_name(net):
+        """Name of a constant net, or the clock (the same in both netlists)"""
+        if net == ZERO_NET:
+            return "\\<const0> "
+        if net == ONE_NET:
+            return "\\<const1> "
+        if net == CLOCK_NET:
+            return "clk"
+        return None
+
+    def _write_header(self, fp, net_name, ibuf_prefix):
+        """Write the ports and wires, the constant drivers, and the IBUFs driving the nets of
+        the top-level inputs"""
+        last_port = self.num_ports - 1
+        fp.write(
+            f"module {self.top} (clk, din, dout);\n"
+            "  input clk;\n"
+            f"  input [{last_port}:0] din;\n"
+            f"  output [{last_port}:0] dout;\n"
+            "  wire \\<const0> ;\n"
+            "  wire \\<const1> ;\n"
+        )
+        for net in range(FIRST_INPUT_NET, self.num_nets):
+            fp.write(f"  wire {net_name(net)};\n")
+        fp.write("  GND GND (.G(\\<const0> ));\n")
+        fp.write("  VCC VCC (.P(\\<const1> ));\n")
+        for i in range(self.num_ports):
+            fp.write(
+                f"  IBUF {ibuf_prefix}_{i} (.I(din[{i}]), .O({net_name(FIRST_INPUT_NET + i)}));\n"
+            )
+
+    def _cell_verilog(self, cell, name, net_name):
+        """Verilog instance of a cell"""
+        cell_type = CELL_TYPES[self.cell_types[cell]]
+        params = ", ".join(f".{param}({value})" for param, value in self._cell_params(cell))
+        text = f"  {cell_type} #({params}) {name} (\n" if params else f"  {cell_type} {name} (\n"
+
+        nets = iter(self.connections[self.first_connection[cell] : self.first_connection[cell + 1]])
+        ports = []
+        for port, width, _ in PORTS[cell_type]:
+            if width == 1:
+                ports.append(f"    .{port}({net_name(next(nets))})")
+            else:
+                bits = [net_name(next(nets)) for _ in range(width)]
+                ports.append(f"    .{port}({{{', '.join(reversed(bits))}}})")
+        return text + ",\n".join(ports) + "\n  );\n"
+
+    def _cell_params(self, cell):
+        """(name, value) of the properties of a cell"""
+        cell_type = CELL_TYPES[self.cell_types[cell]]
+        param = self.params[cell]
+        if cell_type == "LUT6_2":
+            return [("INIT", f"64'h{self.lut_inits[param]:016X}")]
+        if cell_type == "FDRE":
+            return [("INIT", f"1'b{param}")]
+        rng = random.Random(param)
+        if cell_type == "RAM32M":
+            return [(f"INIT_{x}", f"64'h{rng.getrandbits(64):016X}") for x in "ABCD"]
+        if cell_type == "RAMB36E1":
+            # Only the first line of the memory is initialized, like a small ROM
+            return [
+                (f"INIT_{i:02X}", f"256'h{rng.getrandbits(256) if i == 0 else 0:064X}")
+                for i in range(0x80)
+            ]
+        return []
+
+
+def generate_netlist_pair(directory, num_cells, seed=0, mix=None):
+    """Write a golden (<name>_physical.v) and reversed (<name>_reversed.v) netlist pair with
+    num_cells cells, named synthetic_<num_cells>, to directory"""
+    name = f"synthetic_{num_cells}"
+    netlist = SyntheticNetlist(num_cells, seed, mix)
+    golden_netlist = directory / f"{name}_physical.v"
+    reversed_netlist = directory / f"{name}_reversed.v"
+    netlist.write_golden(golden_netlist)
+    netlist.write_reversed(reversed_netlist)
+    return NetlistPair(name, golden_netlist, reversed_netlist, golden_netlist)
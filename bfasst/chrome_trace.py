@@ -0,0 +1,84 @@
+""" Timeline of an experiment run, in the Chrome trace event format """
+
+import json
+import time
+
+from bfasst import metrics
+
+
+class ChromeTrace:
+    """Writes a trace event file (viewable in Perfetto or chrome://tracing) with a track per
+    worker, a span for each job, and nested spans for the phases recorded inside the job (see
+    metrics.phase()).  Events are appended as jobs finish, in the json array format, which
+    doesn't need to be closed, so the trace of a killed experiment can still be viewed."""
+
+    PID = 1
+
+    # Track for jobs that never reported back (killed for running too long, or their worker
+    # died), which are drawn up to the time they were given up on
+    UNFINISHED_TID = 0
+
+    def __init__(self, path):
+        self.path = path
+        # Worker description -> track (thread) id
+        self.tids = {}
+        with open(self.path, "w") as fp:
+            fp.write("[\n")
+        self._write(
+            [
+                self._metadata("process_name", 0, "bfasst experiment"),
+                self._metadata("thread_name", self.UNFINISHED_TID, "unfinished jobs"),
+            ]
+        )
+
+    def _metadata(self, name, tid, value):
+        return {"name": name, "ph": "M", "pid": self.PID, "tid": tid, "args": {"name": value}}
+
+    def _write(self, events):
+        with open(self.path, "a") as fp:
+            for event in events:
+                fp.write(json.dumps(event) + ",\n")
+
+    def _span(self, name, tid, start, duration, args):
+        return {
+            "name": name,
+            "ph": "X",
+            "pid": self.PID,
+            "tid": tid,
+            "ts": start * 1e6,
+            "dur": duration * 1e6,
+            "args": args,
+        }
+
+    def job_finished(self, job, result):
+        """Add the spans of a finished job to the trace"""
+        name = f"{job.design_rel_path.name} {job.tool_name}"
+        args = {"job": job.key, "status": result.status}
+        phases = {record["phase"]: record for record in result.metrics}
+
+        if metrics.RUN not in phases:
+            start = time.time() - result.runtime
+            self._write([self._span(name, self.UNFINISHED_TID, start, result.runtime, args)])
+            return
+
+        events = []
+        if result.worker not in self.tids:
+            self.tids[result.worker] = len(self.tids) + 1
+            events.append(self._metadata("thread_name", self.tids[result.worker], result.worker))
+        tid = self.tids[result.worker]
+
+        if metrics.LAUNCH in phases:
+            args["launch_s"] = phases[metrics.LAUNCH]["wall"]
+        run = phases[metrics.RUN]
+        events.append(self._span(name, tid, run["start"], run["wall"], args))
+
+        for record in result.metrics:
+            if record["phase"] in (metrics.LAUNCH, metrics.RUN):
+                continue
+            phase_args = {
+                key: value for key, value in record.items() if key not in ("phase", "start", "wall")
+            }
+            events.append(
+                self._span(record["phase"], tid, record["start"], record["wall"], phase_args)
+            )
+        self._write(events)
@@ -28,6 +28,7 @@ class CompareTool(Tool):
     def cleanup(self):
         """Perform cleanup after the tool has finished running"""
         self.arg_parser = None
+        self.close_log()
 
     def add_args(self):
         """Default arguments for all compare tools"""
@@ -50,16 +51,38 @@ class CompareTool(Tool):
 
         return ToolProduct(None, log_path, check_log_fcn)
 
+    def golden_paths(self):
+        """Files of the golden design, which the comparison result depends on as much as the
+        reversed netlist.  Changing them changes the tool's fingerprint (and so its artifact
+        cache key):
+
+        >>> import tempfile
+        >>> class Compare(CompareTool):
+        ...     TOOL_WORK_DIR = "compare"
+        ...     def compare_netlists(self):
+        ...         pass
+        >>> build_dir = pathlib.Path(tempfile.mkdtemp())
+        >>> for name in ("golden.v", "reversed.v"):
+        ...     _ = (build_dir / name).write_text(f"module {name[:-2]}; endmodule")
+        >>> tool = Compare(build_dir, None, build_dir / "golden.v", build_dir / "reversed.v")
+        >>> digest = tool.fingerprint([], tool.golden_paths())["digest"]
+        >>> tool.fingerprint([], tool.golden_paths())["digest"] == digest
+        True
+        >>> _ = (build_dir / "golden.v").write_text("module other_golden; endmodule")
+        >>> tool.fingerprint([], tool.golden_paths())["digest"] == digest
+        False
+        """
+        if isinstance(self.gold_netlist, (list, tuple)):
+            return [pathlib.Path(path) for path in self.gold_netlist]
+        return [pathlib.Path(self.gold_netlist)]
+
     def up_to_date(self, check_log_fcn):
         """Determine whether to skip or run the comparison"""
         self.design.reversed_netlist_path = self.cwd / f"{self.design.top}_reversed.v"
 
         if not self.need_to_rerun(
             tool_products=(self.generate_comparison(check_log_fcn),),
-            dependency_modified_time=max(
-                pathlib.Path(__file__).stat().st_mtime,
-                self.design.reversed_netlist_path.stat().st_mtime,
-            ),
+            dependencies=self.golden_paths() + [self.design.reversed_netlist_path],
         ):
             self.print_skipping_compare()
             return True
@@ -12,19 +12,19 @@ import paramiko
 import scp
 
 import bfasst
-from bfasst import paths
+from bfasst import metrics, paths
 from bfasst.design import HdlType
 from bfasst.tool import BfasstException
 from bfasst.compare.base import CompareException, CompareTool
-from bfasst.types import Vendor
+from bfasst.types import Resource, Vendor
 from bfasst.utils import error
-from bfasst.locks import conformal_lock
 
 
 class ConformalCompareTool(CompareTool):
     """Run confomal comparison tool"""
 
     TOOL_WORK_DIR = "conformal"
+    RESOURCES = {Resource.CONFORMAL_LICENSE: 1}
     LOG_FILE_NAME = "log.txt"
     DO_FILE_NAME = "compare.do"
     GUI_FILE_NAME = "run_conformal_gui.sh"
@@ -41,8 +41,7 @@ class ConformalCompareTool(CompareTool):
 
     def compare_netlists(self):
         self.launch()
-        with conformal_lock:
-            self._compare_netlists()
+        self._compare_netlists()
         self.cleanup()
 
     def _compare_netlists(self):
@@ -249,6 +248,7 @@ class ConformalCompareTool(CompareTool):
         )
         scp_client.close()
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_compare_status(self, log_path):
         """Check log file for status"""
         log_text = open(log_path).read()
@@ -6,7 +6,7 @@ import yaml
 
 from bfasst import paths
 from bfasst.compare.base import CompareTool
-from bfasst.locks import onespin_lock
+from bfasst.types import Resource
 
 ONESPIN_TCL_TEMPLATE = "run_onespin.tcl"
 ONESPIN_PY_TEMPLATE = "run_onespin.py"
@@ -16,11 +16,11 @@ class OneSpinCompareTool(CompareTool):
     """OneSpin compare tool."""
 
     TOOL_WORK_DIR = "onespin"
+    RESOURCES = {Resource.ONESPIN_LICENSE: 1}
 
     def compare_netlists(self):
         self.launch()
-        with onespin_lock:
-            self._compare_netlists()
+        self._compare_netlists()
         self.cleanup()
 
     def _compare_netlists(self):
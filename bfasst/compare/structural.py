@@ -1,10 +1,14 @@
 """ Structural Comparison and Mapping tool """
 
+import itertools
+
 from bidict import bidict
 import spydrnet as sdn
-from bfasst import jpype_jvm
+from bfasst import jpype_jvm, metrics
 from bfasst.compare.base import CompareTool, CompareException
-from bfasst.utils import error, properties_are_equal
+from bfasst.log_sink import LogLevel
+from bfasst.types import Resource
+from bfasst.utils import error, properties_key
 import bfasst.rw_helpers as rw
 
 
@@ -12,6 +16,7 @@ class StructuralCompareTool(CompareTool):
     """Structural compare and map"""
 
     TOOL_WORK_DIR = "struct_cmp"
+    RESOURCES = {Resource.JVM: 1, Resource.MEMORY_GB: 4}
 
     def __init__(self, cwd, design, gold_netlist, rev_netlist, flow_args="") -> None:
         super().__init__(cwd, design, gold_netlist, rev_netlist, flow_args)
@@ -23,6 +28,16 @@ class StructuralCompareTool(CompareTool):
         self.block_mapping = bidict()
         self.net_mapping = bidict()
 
+        # Unmapped reversed instances, by cell type, then by the values of the properties that
+        # must match (see get_properties_key), so that finding the candidates to map an
+        # instance to doesn't scan the whole reversed netlist
+        self.unmapped_instances = {}
+
+        # Golden instances to consider in the next mapping iteration (a dict, as an ordered set)
+        self.worklist = {}
+        # Reversed instance -> golden instances to consider again once it is mapped
+        self.waiting_on = {}
+
         init_only = (
             "LUT6_2",
             "FDSE",
@@ -56,6 +71,19 @@ class StructuralCompareTool(CompareTool):
 
         self._cell_props = _cell_props
 
+        # Default values of the properties above (from the UNISIM library), which netlists may
+        # leave out, eg. the INIT_xx of a RAMB36E1 that aren't used
+        _cell_prop_defaults = {x: {"INIT": "0"} for x in init_only}
+        _cell_prop_defaults.update({x: {"INIT": "1"} for x in ("FDSE", "FDPE")})
+        _cell_prop_defaults["RAM32M"] = dict.fromkeys(_cell_props["RAM32M"], "0")
+        _cell_prop_defaults["RAMB36E1"] = dict.fromkeys(_cell_props["RAMB36E1"], "0")
+        _cell_prop_defaults["BUFGCTRL"] = {
+            **dict.fromkeys(_cell_props["BUFGCTRL"], "0"),
+            "PRESELECT_I0": "FALSE",
+            "PRESELECT_I1": "FALSE",
+        }
+        self._cell_prop_defaults = _cell_prop_defaults
+
         self.run_num = None
 
         jpype_jvm.start()
@@ -63,6 +91,9 @@ class StructuralCompareTool(CompareTool):
     def reset_mappings(self):
         self.block_mapping = bidict()
         self.net_mapping = bidict()
+        self.unmapped_instances = {}
+        self.worklist = {}
+        self.waiting_on = {}
 
     def check_log_path(self):
         if self.run_num is not None:
@@ -79,18 +110,20 @@ class StructuralCompareTool(CompareTool):
         self.log_title("Building netlist A", impl_netlist)
 
         # Loads the first netlist as intermediate representation (ir1)
-        ir_a = sdn.parse(str(impl_netlist))
+        with metrics.phase("parse"):
+            ir_a = sdn.parse(str(impl_netlist))
         library_a = ir_a.libraries[0]
         netlist_a = self.get_netlist(library_a)
-        self.log(f"Golden netlist size: {len(netlist_a.instances)}")
+        self.info("Golden netlist size: %d", len(netlist_a.instances))
 
         self.log_title("Building netlist B", netlist_b)
 
         # Loads the second netlist as intermediate representation (ir2)
-        ir_b = sdn.parse(str(netlist_b))
+        with metrics.phase("parse"):
+            ir_b = sdn.parse(str(netlist_b))
         library_b = ir_b.libraries[0]
         netlist_b = self.get_netlist(library_b)
-        self.log(f"Reversed netlist size: {len(netlist_b.instances)}")
+        self.info("Reversed netlist size: %d", len(netlist_b.instances))
 
         # golden_netlist = [i for i in golden_netlist if i.name not in ("GND")]
 
@@ -100,36 +133,37 @@ class StructuralCompareTool(CompareTool):
         # Structurally map the rest of the netlists
         self.perform_mapping()
 
-        self.log_title("Mapping (Instances)")
-        for key, val in self.block_mapping.items():
-            self.log(f"{key.name} -> {val.name}")
-        self.log()
-        self.log_title("Mapping (Nets)")
-        for key, val in self.net_mapping.items():
-            self.log(f"{key.name} -> {val.name}")
+        if self.log_enabled(LogLevel.DEBUG):
+            self.log_title("Mapping (Instances)")
+            for key, val in self.block_mapping.items():
+                self.debug("%s -> %s", key.name, val.name)
+            self.debug("")
+            self.log_title("Mapping (Nets)")
+            for key, val in self.net_mapping.items():
+                self.debug("%s -> %s", key.name, val.name)
 
         self.log_title("Finalizing")
-        self.log(
-            "Number of mapped blocks: ",
-            f"{len(self.block_mapping)} of {len(self.named_netlist.instances_to_map)}",
+        self.info(
+            "Number of mapped blocks:  %d of %d",
+            len(self.block_mapping),
+            len(self.named_netlist.instances_to_map),
         )
-        self.log("  Unmapped blocks:")
+        self.info("  Unmapped blocks:")
         for block in [
             block
             for block in self.named_netlist.instances_to_map
             if block not in self.block_mapping
         ]:
-            self.log(f"    {block.name}")
+            self.info("    %s", block.name)
 
+        connected_nets = self.named_netlist.get_connected_nets()
         num_mapped_nets = len([net for net in self.net_mapping if net.is_connected()])
-        num_total_nets = len(self.named_netlist.get_connected_nets())
-        self.log("Number of mapped nets:", num_mapped_nets, "of", num_total_nets)
+        num_total_nets = len(connected_nets)
+        self.info("Number of mapped nets: %d of %d", num_mapped_nets, num_total_nets)
 
-        self.log("  Unmapped nets:")
-        for net in [
-            net for net in self.named_netlist.get_connected_nets() if net not in self.net_mapping
-        ]:
-            self.log(f"    {net.name}")
+        self.info("  Unmapped nets:")
+        for net in [net for net in connected_nets if net not in self.net_mapping]:
+            self.info("    %s", net.name)
 
         if len(self.block_mapping) != len(self.named_netlist.instances_to_map):
             raise CompareException("Could not map all blocks")
@@ -141,73 +175,89 @@ class StructuralCompareTool(CompareTool):
 
         self.cleanup()
 
+    @metrics.phase("perform_mapping")
     def perform_mapping(self):
         """Maps netlists based on their cells and nets"""
 
+        self.index_unmapped_instances()
+
         # First map top-level nets
         self.log_title("Mapping top-level ports")
         for pin in self.named_netlist.pins:
             assert isinstance(pin, Pin)
-            self.log(
-                "Mapping port",
-                f"{pin.name}[{pin.index}] to",
-                f"{pin.name}[{pin.index}]",
-            )
+            self.debug("Mapping port %s[%s] to %s[%s]", pin.name, pin.index, pin.name, pin.index)
             self.add_net_mapping(
                 pin.net,
                 self.reversed_netlist.get_pin(pin.name, pin.index).net,
             )
 
         self.log_title("Starting mapping iterations")
-        progress = True
-
-        # Loop until all blocks have been mapped or there is no more progress
 
+        # Each iteration considers the instances whose nets, or candidates, were mapped during
+        # the previous one (see add_net_mapping and add_block_mapping), until no more progress
+        # can be made
+        self.worklist = dict.fromkeys(
+            i for i in self.named_netlist.instances_to_map if i not in self.block_mapping
+        )
         iteration = 0
-        while len(self.block_mapping) < len(self.named_netlist.instances_to_map):
-            if not progress:
-                self.log(f"No more progress can be made. Failed at iteration {iteration}.")
-                break
-            progress = False
+        while self.worklist and len(self.block_mapping) < len(self.named_netlist.instances_to_map):
+            instances, self.worklist = self.worklist, {}
 
-            self.log(f"===== Mapping Iteration {iteration} =====")
+            with metrics.phase("mapping_iteration") as phase_record:
+                phase_record["iteration"] = iteration
+                phase_record["instances"] = len(instances)
+                self.debug("===== Mapping Iteration %d =====", iteration)
 
-            # Loop through reversed netlist blocks
-            for instance in self.named_netlist.instances_to_map:
-                if instance not in self.block_mapping:
-                    # Skip assign statements (named netlist shouldn't have them)
-                    assert not instance.cell_type.startswith("SDN_VERILOG_ASSIGNMENT")
+                for instance in instances:
+                    if instance not in self.block_mapping:
+                        self.map_instance(instance)
 
-                    self.log(f"Considering {instance.name} ({instance.cell_type})")
+            iteration += 1
 
-                    # Get the implemented potential instance to map
-                    instances_matching = self.check_for_potential_mapping(instance)
+        if len(self.block_mapping) < len(self.named_netlist.instances_to_map):
+            self.info("No more progress can be made. Failed at iteration %d.", iteration)
 
-                    # self.log(f"  {instances_matching} matches")
+    def map_instance(self, instance):
+        """Map a golden instance if it has exactly one possible match"""
+        # Skip assign statements (named netlist shouldn't have them)
+        assert not instance.cell_type.startswith("SDN_VERILOG_ASSIGNMENT")
 
-                    if not instances_matching:
-                        raise CompareException(
-                            f"Not equivalent. {instance.name} has no possible match in the netlist."
-                        )
+        self.trace("Considering %s (%s)", instance.name, instance.cell_type)
 
-                    if len(instances_matching) > 1:
-                        self.log(f"  {len(instances_matching)} matches, skipping for now:")
-                        for matched_instance in instances_matching:
-                            self.log(f"    {matched_instance.name}")
-                        continue
+        # Get the implemented potential instance to map
+        # Two matches are enough to know that the instance can't be mapped yet
+        instances_matching = self.check_for_potential_mapping(instance, limit=2)
 
-                    assert len(instances_matching) == 1
-                    matched_instance = instances_matching[0]
+        if not instances_matching:
+            raise CompareException(
+                f"Not equivalent. {instance.name} has no possible match in the netlist."
+            )
 
-                    self.log(f"  Mapped to {matched_instance.name}")
+        if len(instances_matching) > 1:
+            if self.log_enabled(LogLevel.TRACE):
+                self.trace("  Several matches, skipping for now:")
+                for matched_instance in instances_matching:
+                    self.trace("    %s", matched_instance.name)
 
-                    self.add_block_mapping(instance, matched_instance)
+            # Other than by mapping its nets, the instance can only be left with one match by
+            # mapping all but one of its matches elsewhere, which must include one of any two
+            for matched_instance in instances_matching:
+                self.waiting_on.setdefault(matched_instance, {})[instance] = None
+            return
 
-                    progress = True
-                    continue
+        matched_instance = instances_matching[0]
 
-            iteration += 1
+        self.debug("  Mapped to %s", matched_instance.name)
 
+        self.add_block_mapping(instance, matched_instance)
+
+    def enqueue_for_mapping(self, instances):
+        """Consider unmapped golden instances again in the next mapping iteration"""
+        for instance in instances:
+            if instance not in self.block_mapping:
+                self.worklist[instance] = None
+
+    @metrics.phase("verify_equivalence")
     def verify_equivalence(self):
         """Verify equivalence by looping through all mapped instances and
         checking that for each pin, the connected nets are also mapped
@@ -216,9 +266,12 @@ class StructuralCompareTool(CompareTool):
         # Loop through all instances and check for equivalence
         self.log_title("Verifying equivalence")
         for i, instance in enumerate(self.named_netlist.instances_to_map):
-            self.log(
-                f"  {i+1}/{len(self.named_netlist.instances_to_map)} Instance {instance.name}:",
-                f"verifying net mapping of {len(instance.pins)} pins",
+            self.trace(
+                "  %d/%d Instance %s: verifying net mapping of %d pins",
+                i + 1,
+                len(self.named_netlist.instances_to_map),
+                instance.name,
+                len(instance.pins),
             )
             mapped_instance = self.block_mapping.get(instance)
             if mapped_instance is None:
@@ -260,7 +313,7 @@ class StructuralCompareTool(CompareTool):
                         )
                     )
 
-        self.log("Equivalence verified")
+        self.info("Equivalence verified")
 
     def add_block_mapping(self, instance, matched_instance):
         """Add mapping point between two Instances"""
@@ -268,6 +321,8 @@ class StructuralCompareTool(CompareTool):
         assert isinstance(matched_instance, Instance)
 
         self.block_mapping[instance] = matched_instance
+        self.remove_unmapped_instance(matched_instance)
+        self.enqueue_for_mapping(self.waiting_on.pop(matched_instance, ()))
 
         for pin in instance.pins:
             # Some pins should not be used to establish net mapping
@@ -291,12 +346,8 @@ class StructuralCompareTool(CompareTool):
                 assert net_b == self.net_mapping[net_a]
                 continue
 
-            self.log(
-                "    Net",
-                net_a.name.strip(),
-                "mapped to",
-                net_b.name,
-                f"(from {pin.name})",
+            self.trace(
+                "    Net %s mapped to %s (from %s)", net_a.name.strip(), net_b.name, pin.name
             )
             # self.log(pin.ignore_net_equivalency)
             # self.log(pin.net.is_gnd)
@@ -313,25 +364,62 @@ class StructuralCompareTool(CompareTool):
         assert net2 not in self.net_mapping.inverse
         self.net_mapping[net1] = net2
 
-    def check_for_potential_mapping(self, named_instance):
-        """Returns cells that could map to the named_instance"""
-        all_instances = self.reversed_netlist.instances
+        # Instances on the net may now have fewer possible matches
+        self.enqueue_for_mapping(self.named_netlist.get_instances_on_net(net1))
+
+    def index_unmapped_instances(self):
+        """Index the reversed instances that aren't mapped yet, by cell type and properties"""
+        self.unmapped_instances = {}
+        for instance in self.reversed_netlist.instances:
+            if instance in self.block_mapping.inverse:
+                continue
+            by_props = self.unmapped_instances.setdefault(instance.cell_type, {})
+            # Dicts keep the instances in netlist order, and can remove them in O(1)
+            by_props.setdefault(self.get_properties_key(instance), {})[instance] = None
+
+    def remove_unmapped_instance(self, instance):
+        """Remove a newly mapped reversed instance from the index of unmapped instances"""
+        by_props = self.unmapped_instances.get(instance.cell_type)
+        if by_props is None:
+            return
+        key = self.get_properties_key(instance)
+        instances = by_props.get(key)
+        if instances is None or instance not in instances:
+            return
+        del instances[instance]
+        if not instances:
+            del by_props[key]
+
+    def get_properties_key(self, instance):
+        """Values of the properties that must match for an instance to be mapped (see
+        properties_key), with the default value of any the instance leaves out, or None if its
+        properties aren't known"""
+        if instance.cell_type not in self._cell_props:
+            return None
+        return properties_key(
+            instance.properties or {},
+            self._cell_props[instance.cell_type],
+            self._cell_prop_defaults.get(instance.cell_type),
+        )
+
+    def check_for_potential_mapping(self, named_instance, limit=None):
+        """Returns cells that could map to the named_instance (only the first limit of them,
+        if given)"""
 
         ###############################################################
         # First find all instances of the same type that are unmapped
         ###############################################################
-        instances_matching_cell_type = [
-            i
-            for i in all_instances
-            if i.cell_type == named_instance.cell_type and i not in self.block_mapping.inverse
-        ]
-
-        if not instances_matching_cell_type:
-            self.log("No unmapped instances of type", named_instance.cell_type)
-            return instances_matching_cell_type
-        self.log(
-            f"  {len(instances_matching_cell_type)} unmapped {named_instance.cell_type} instance(s)"
-        )
+        unmapped_by_props = self.unmapped_instances.get(named_instance.cell_type)
+
+        if not unmapped_by_props:
+            self.info("No unmapped instances of type %s", named_instance.cell_type)
+            return []
+        if self.log_enabled(LogLevel.TRACE):
+            self.trace(
+                "  %d unmapped %s instance(s)",
+                sum(len(instances) for instances in unmapped_by_props.values()),
+                named_instance.cell_type,
+            )
 
         ###############################################################
         # Now look at properties
@@ -340,38 +428,38 @@ class StructuralCompareTool(CompareTool):
 
         properties = named_instance.properties
 
-        instances_matching_props = instances_matching_cell_type[:]
         for prop in properties_to_match:
             if properties is None or prop not in properties:
                 error(prop, "not in properties:", properties)
             assert prop in properties
 
-            # Filter by properties match (case insensitive)
-            instances_matching_props = [
-                i
-                for i in instances_matching_cell_type
-                if i not in self.block_mapping.inverse
-                and prop in i.properties
-                and properties_are_equal(properties[prop], i.properties[prop])
-            ]
+        instances_matching_props = unmapped_by_props.get(self.get_properties_key(named_instance))
+
         if not instances_matching_props:
-            self.log(
-                f"No unmapped instances of {named_instance.cell_type} with matching properties",
+            self.info(
+                "No unmapped instances of %s with matching properties %s",
+                named_instance.cell_type,
                 ",".join(p + "=" + properties[p] for p in properties_to_match),
-                "\n  "
+            )
+            # Every unmapped instance of the type, which can be a large part of the netlist
+            self.debug(
+                lambda: "  "
                 + "\n  ".join(
-                    str(i.name) + " " + str(i.properties) for i in instances_matching_cell_type
-                ),
+                    str(i.name) + " " + str(i.properties)
+                    for instances in unmapped_by_props.values()
+                    for i in instances
+                )
             )
-            return instances_matching_props
-        self.log(f"  {len(instances_matching_props)} instance(s) after filtering on properties")
+            return []
+        self.trace("  %d instance(s) after filtering on properties", len(instances_matching_props))
 
         ###############################################################
         # Now look at connections
         ###############################################################
 
-        instances_matching_connections = instances_matching_props[:]
-
+        # Pins connected to a mapped net, with the instances connected to the corresponding
+        # mapped net, most selective first
+        mapped_pins = []
         for pin in named_instance.pins:
             assert isinstance(pin, Pin)
 
@@ -379,29 +467,39 @@ class StructuralCompareTool(CompareTool):
             if pin.net not in self.net_mapping:
                 continue
 
-            # Otherwise pin connected to a mapped net, and filter based on instances that are
-            # connected to the corresponding mapped net.
             other_net = self.net_mapping[pin.net]
-
-            self.log(f"  Filtering on pin {pin.name_with_index}, {other_net.name}")
-
-            # for instance in instances_matching_connections:
-            #     self.log(
-            #         instance.get_pin(pin.name, pin.index).name_with_index,
-            #         instance.get_pin(pin.name, pin.index).net.name,
-            #     )
+            connected_instances = self.reversed_netlist.get_instances_connected(
+                other_net, pin.name, pin.index
+            )
+            mapped_pins.append((pin, other_net, connected_instances))
+        mapped_pins.sort(key=lambda mapped_pin: len(mapped_pin[2]))
+
+        # Start from whichever is smaller: the candidates, or the instances on the most
+        # selective pin's mapped net, then check the other pins' nets of each
+        instances_matching_connections = instances_matching_props
+        if mapped_pins and len(mapped_pins[0][2]) < len(instances_matching_props):
+            _, _, connected_instances = mapped_pins.pop(0)
             instances_matching_connections = [
+                instance for instance in connected_instances if instance in instances_matching_props
+            ]
+        for pin, other_net, _ in mapped_pins:
+            self.trace("  Filtering on pin %s, %s", pin.name_with_index, other_net.name)
+
+        instances_matching_connections = itertools.islice(
+            (
                 instance
                 for instance in instances_matching_connections
-                if instance.get_pin(pin.name, pin.index).net == other_net
-            ]
-            self.log(
-                f"    {len(instances_matching_connections)} remaining:",
-                ",".join(i.name for i in instances_matching_connections),
-            )
+                if all(
+                    instance.get_pin(pin.name, pin.index).net == other_net
+                    for pin, other_net, _ in mapped_pins
+                )
+            ),
+            limit,
+        )
+        instances_matching_connections = list(instances_matching_connections)
 
-        self.log(
-            f"  {len(instances_matching_connections)} instance(s) after filtering on connections"
+        self.trace(
+            "  %d instance(s) after filtering on connections", len(instances_matching_connections)
         )
 
         return instances_matching_connections
@@ -426,8 +524,12 @@ class Netlist:
 
         # Nets
         self.wire_to_net = {}
+        self.nets = []
         self.build_nets()
 
+        # (port name, index) of the pins of the cells' ports, see get_pin_key
+        self.pin_keys = {}
+
         # Instances
         instances = [Instance(i, self) for i in library.get_instances()]
         # instances = [i for i in instances if i.cell_type not in ("VCC", "GND")]
@@ -445,61 +547,121 @@ class Netlist:
             assert key not in self.pins_by_name_and_idx
             self.pins_by_name_and_idx[key] = pin
 
+        # Instances by (net, pin name, pin index) of their connections, and instances to map by
+        # net, built when first used
+        self.instances_by_connection = None
+        self.instances_to_map_by_net = None
+
     def get_pin(self, name, index):
         return self.pins_by_name_and_idx[(name, index)]
 
+    def get_pin_key(self, inner_pin):
+        """(port name, index in the port) of a pin of a cell's (or the top-level) port.  The
+        keys of all the port's pins are found at once, and shared by all instances of the
+        cell, rather than searching the port's pins for each pin of each instance."""
+        key = self.pin_keys.get(inner_pin)
+        if key is None:
+            port = inner_pin.port
+            name = port.name
+            for index, port_pin in enumerate(port.pins):
+                self.pin_keys[port_pin] = (name, index)
+            key = self.pin_keys[inner_pin]
+        return key
+
+    def get_instances_connected(self, net, pin_name, pin_index):
+        """Instances whose pin (pin_name, pin_index) is connected to net"""
+        if self.instances_by_connection is None:
+            self.instances_by_connection = {}
+            for instance in self.instances:
+                for pin in instance.pins:
+                    key = (pin.net, pin.name, pin.index)
+                    self.instances_by_connection.setdefault(key, []).append(instance)
+        return self.instances_by_connection.get((net, pin_name, pin_index), ())
+
+    def get_instances_on_net(self, net):
+        """Instances to map that have a pin connected to net"""
+        if self.instances_to_map_by_net is None:
+            self.instances_to_map_by_net = {}
+            for instance in self.instances_to_map:
+                for pin in instance.pins:
+                    self.instances_to_map_by_net.setdefault(pin.net, {})[instance] = None
+        return self.instances_to_map_by_net.get(net, ())
+
     def num_wires(self):
         return len(list(self.library.get_wires()))
 
+    @metrics.phase("build_nets")
     def build_nets(self):
         """Setup Net objects"""
+        self.wire_to_net = {}
+        self.nets = []
+
+        # Find the alias wires (derived from assign statements), and the wire assigned to each,
+        # in one pass over the wires
+        wires = list(self.library.get_wires())
+        assigned_from = {}
+        for wire in wires:
+            assign_pin = Net.get_assign_output_pin(wire)
+            if assign_pin is not None:
+                assigned_from[wire] = Net.get_assign_input_wire(assign_pin)
+
         # First construct net objects for each wire, skipping alias wires
-        non_alias_wires = [wire for wire in self.library.get_wires() if not Net.wire_is_alias(wire)]
-        for wire in non_alias_wires:
+        for wire in wires:
+            if wire in assigned_from:
+                continue
             net = Net(wire, self.tool)
-            self.tool.log(f"New Net for wire {wire.cable.name}[{wire.index()}]")
+            if self.tool.log_enabled(LogLevel.TRACE):
+                self.tool.trace("New Net for wire %s[%d]", wire.cable.name, wire.index())
             self.wire_to_net[wire] = net
+            self.nets.append(net)
+
+        self.tool.debug("Processing alias wires (derived from assign statements)")
+
+        # Then add each alias wire to the net of the wire at the start of its chain of assign
+        # statements.  Each wire of a chain is only followed once, as it is added to the net
+        # (or found to have no driver) along with the rest of the chain.
+        unresolved_wires = set()
+        for alias_wire in assigned_from:
+            chain = {}
+            wire = alias_wire
+            while (
+                wire in assigned_from
+                and wire not in self.wire_to_net
+                and wire not in unresolved_wires
+                and wire not in chain
+            ):
+                chain[wire] = None
+                wire = assigned_from[wire]
 
-        # Now add alias wires iteratively until they are all added
-        alias_wires = [wire for wire in self.library.get_wires() if Net.wire_is_alias(wire)]
-
-        self.tool.log("Processing alias wires (derived from assign statements)")
-
-        progress = True
-        while alias_wires and progress:
-            progress = False
-            processed_alias_wires = []
-            for wire in alias_wires:
-                driver_wire = Net.wire_derived_from(wire)
-                if driver_wire not in self.wire_to_net:
-                    continue
-
-                net = self.wire_to_net[driver_wire]
-                self.tool.log(
-                    f"Adding alias wire {wire.cable.name}[{wire.index()}]",
-                    f"to net {net.name}[{net.wire.index()}]",
-                )
-                net.add_alias_wire(wire)
-                self.wire_to_net[wire] = net
-                processed_alias_wires.append(wire)
-
-            # Remove wires we processed
-            old_len = len(alias_wires)
-            alias_wires = [wire for wire in alias_wires if wire not in processed_alias_wires]
-            if len(alias_wires) != old_len:
-                progress = True
-
-        if alias_wires and not progress:
-            self.tool.log("Failed to process all alias wires:", [w.cable.name for w in alias_wires])
+            net = self.wire_to_net.get(wire)
+            if net is None:
+                # Assigned from a wire with no net, or from itself through the chain
+                unresolved_wires.update(chain)
+                continue
+            for chained_wire in chain:
+                if self.tool.log_enabled(LogLevel.TRACE):
+                    self.tool.trace(
+                        "Adding alias wire %s[%d] to net %s[%d]",
+                        chained_wire.cable.name,
+                        chained_wire.index(),
+                        net.name,
+                        net.wire.index(),
+                    )
+                assert chained_wire not in self.wire_to_net
+                net.add_alias_wire(chained_wire)
+                self.wire_to_net[chained_wire] = net
+
+        if unresolved_wires:
+            self.tool.info(
+                "Failed to process all alias wires: %s",
+                [w.cable.name for w in assigned_from if w in unresolved_wires],
+            )
             raise RuntimeError("Failed to process all alias wires")
 
-        # Now determine the driver for each net
+        # Now determine the driver, and then the fanout, of each net
         for net in self.nets:
             net.find_driver()
-
-    @property
-    def nets(self):
-        return set(self.wire_to_net.values())
+            net.find_fanout()
 
     def get_connected_nets(self):
         """Return a list of nets that are connected to something"""
@@ -509,17 +671,18 @@ class Netlist:
 class Pin:
     """Wrapper class around spydernet InnerPin/OuterPin to add some helper properties"""
 
+    # There is a Pin for every pin of every instance, so don't give each one a __dict__
+    __slots__ = ("pin", "instance", "netlist", "name", "index", "ignore_net_equivalency")
+
     def __init__(self, pin, instance, netlist):
         self.pin = pin
         self.instance = instance
         self.netlist = netlist
         if isinstance(pin, sdn.OuterPin):
-            self.name = self.pin.inner_pin.port.name
-            self.index = self.pin.inner_pin.port.pins.index(self.pin.inner_pin)
+            self.name, self.index = netlist.get_pin_key(pin.inner_pin)
             self.ignore_net_equivalency = self._ignore_net_equivalency(instance)
         else:
-            self.name = self.pin.port.name
-            self.index = self.pin.port.pins.index(self.pin)
+            self.name, self.index = netlist.get_pin_key(pin)
             self.ignore_net_equivalency = False
 
     def _ignore_net_equivalency(self, instance):
@@ -527,7 +690,10 @@ class Pin:
         # Ignore net equivalency on constant LUT inputs
         # The logic function PROBABLY doesn't depend on this LUT input
         # TODO: Verify this by looking at the LUT INIT
-        if instance.cell_type == "LUT6_2" and self.net and (self.net.is_vdd or self.net.is_gnd):
+        if instance.cell_type != "LUT6_2":
+            return False
+        net = self.net
+        if net and (net.is_vdd or net.is_gnd):
             return True
         return False
 
@@ -552,6 +718,8 @@ class Pin:
 class Net:
     """Wrapper class around spydernet Wire to add some helper properties"""
 
+    __slots__ = ("wire", "tool", "alias_wires", "driver_pin", "is_vdd", "is_gnd", "fanout")
+
     def __init__(self, wire, tool):
         self.wire = wire
         self.tool = tool
@@ -559,9 +727,12 @@ class Net:
         self.driver_pin = None
         self.is_vdd = None
         self.is_gnd = None
+        # Number of pins driven by the net, see find_fanout
+        self.fanout = 0
 
     def add_alias_wire(self, wire):
-        assert wire not in self.alias_wires
+        # Netlist.build_nets checks the wire isn't in any net yet, as searching alias_wires
+        # would be quadratic on nets with many alias wires
         self.alias_wires.append(wire)
 
     def is_connected(self):
@@ -571,8 +742,13 @@ class Net:
         if not self.driver_pin and not self.is_vdd and not self.is_gnd:
             return False
 
-        pins_that_drive = [
-            p
+        return self.fanout > 0
+
+    def find_fanout(self):
+        """Count the pins this net (including its alias wires) drives, once its driver is
+        known, so that is_connected doesn't go through them each time"""
+        self.fanout = sum(
+            1
             for wire in ([self.wire] + self.alias_wires)
             for p in wire.pins
             if p != self.driver_pin
@@ -580,8 +756,7 @@ class Net:
                 isinstance(p, sdn.InnerPin)
                 or not p.instance.reference.name.startswith("SDN_VERILOG_ASSIGNMENT_1")
             )
-        ]
-        return bool(pins_that_drive)
+        )
 
     def find_driver(self):
         """Determine the pin that drives this wire"""
@@ -652,8 +827,8 @@ class Net:
     #     return None
 
     @staticmethod
-    def wire_is_alias(wire):
-        """Return whether wire is an alias of another wire (ie derived from assign statement)"""
+    def get_assign_output_pin(wire):
+        """If a wire is driven by an assign statement, return the statement's output pin"""
         for pin in wire.pins:
             # assign statements don't have InnerPins
             if isinstance(pin, sdn.InnerPin):
@@ -663,35 +838,40 @@ class Net:
                 pin.instance.reference.name.startswith("SDN_VERILOG_ASSIGNMENT")
                 and pin.inner_pin.port.name == "o"
             ):
-                return True
-        return False
+                return pin
+        return None
 
     @staticmethod
-    def wire_derived_from(wire):
-        """If a wire is derived from another wire via assign statement, return the driver wire"""
-        for pin in wire.pins:
-            # assign statements don't have InnerPins
-            if isinstance(pin, sdn.InnerPin):
-                continue
+    def get_assign_input_wire(pin):
+        """The wire driving an assign statement, from the statement's output pin"""
+        pins = list(pin.instance.pins)
+        if pin.inner_pin.port.name == pins[0].inner_pin.port.name:
+            return pins[1].wire
+        return pins[0].wire
 
-            if (
-                pin.instance.reference.name.startswith("SDN_VERILOG_ASSIGNMENT")
-                and pin.inner_pin.port.name == "o"
-            ):
-                # Get the wire driving the assign statement
-                if pin.inner_pin.port.name == list(pin.instance.pins)[0].inner_pin.port.name:
-                    return list(pin.instance.pins)[1].wire
-                return list(pin.instance.pins)[0].wire
+    @staticmethod
+    def wire_is_alias(wire):
+        """Return whether wire is an alias of another wire (ie derived from assign statement)"""
+        return Net.get_assign_output_pin(wire) is not None
 
-        return None
+    @staticmethod
+    def wire_derived_from(wire):
+        """If a wire is derived from another wire via assign statement, return the driver wire"""
+        pin = Net.get_assign_output_pin(wire)
+        if pin is None:
+            return None
+        return Net.get_assign_input_wire(pin)
 
 
 class Instance:
     """Wrapper class around spydernet Instance to add some helper properties"""
 
+    __slots__ = ("instance", "netlist", "cell_type", "pins", "pins_by_name_and_index")
+
     def __init__(self, instance, netlist):
         self.instance = instance
         self.netlist = netlist
+        self.cell_type = instance.reference.name
 
         self.pins = []
         self.pins_by_name_and_index = {}
@@ -699,21 +879,13 @@ class Instance:
         for pin_spydernet in self.instance.pins:
             pin = Pin(pin_spydernet, self, self.netlist)
             self.pins.append(pin)
-            self.pins_by_name_and_index[
-                (
-                    pin_spydernet.inner_pin.port.name,
-                    pin_spydernet.inner_pin.port.pins.index(pin_spydernet.inner_pin),
-                )
-            ] = pin
+            # Share the key with the other instances of the cell
+            self.pins_by_name_and_index[netlist.get_pin_key(pin_spydernet.inner_pin)] = pin
 
     @property
     def name(self):
         return self.instance.name
 
-    @property
-    def cell_type(self):
-        return self.instance.reference.name
-
     @property
     def properties(self):
         return self.instance.data.get("VERILOG.Parameters")
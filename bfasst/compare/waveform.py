@@ -7,6 +7,7 @@ from wafove.templates import get_paths
 from wafove.tools import analyze_graph
 
 import bfasst
+from bfasst import metrics
 from bfasst.compare.base import CompareTool, CompareException
 from bfasst.config import VIVADO_BIN_PATH
 
@@ -142,6 +143,7 @@ class WaveformCompareTool(CompareTool):
         self.log("Equivalent")
         self.cleanup()
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_compare_status(self, log_path):
         """Used to confirm whether a design is equivalent or not."""
         with open(log_path, "r") as log:
@@ -1,6 +1,7 @@
 """Yosys equivalence checker"""
 import pathlib
 import re
+from bfasst import metrics
 from bfasst.compare.base import CompareException, CompareTool
 from bfasst.tool import ToolProduct
 
@@ -89,6 +90,7 @@ class YosysCompareTool(CompareTool):
 
         return script_file_path
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_compare_status(self, log_path):
         """Checks the log file for the result of the equivalence check"""
         log_text = open(log_path).read()
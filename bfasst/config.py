@@ -14,7 +14,8 @@ CONFORMAL_REMOTE_WORK_DIR = Path("/fsj/squallzz/bfasst_work")
 CONFORMAL_REMOTE_LIBS_DIR = Path("/fsj/squallzz/bfasst_libs")
 CONFORMAL_REMOTE_PATH = Path("/ee2/Cadence/CONFRML152/bin/lec")
 
-VIVADO_BIN_PATH = os.environ["VIVADO_PATH"]
+# Vivado on the PATH if not set, so that tools not using Vivado can run without it
+VIVADO_BIN_PATH = os.environ.get("VIVADO_PATH", "vivado")
 VIVADO_COMMAND = [str(VIVADO_BIN_PATH), "-nojournal", "-nolog", "-mode", "tcl"]
 
 I2C_LSE_TIMEOUT = 600.0
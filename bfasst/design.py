@@ -1,5 +1,4 @@
 """A class holding a design object, coordinating different parts of the flow"""
-import os
 import enum
 import yaml
 
@@ -204,8 +203,14 @@ class Design:
     # def reversed_netlist_filename(self):
     #     return os.path.basename(self.reversed_netlist_path)
 
-    def last_modified_time(self):
-        return max(os.path.getmtime(f) for f in (self.yaml_path, self.top_file_path))
+    def source_paths(self):
+        """All the files synthesis reads: the design yaml and every HDL source"""
+        return [
+            self.yaml_path,
+            self.top_file_path,
+            *self.get_support_files(),
+            *sorted(self.vhdl_libs),
+        ]
 
     def get_golden_hdl_type(self):
         if self.golden_sources is None:
@@ -1,6 +1,5 @@
 """ Track a BFASST experiment configuration (flow with multiple designs)"""
 
-import datetime
 import pathlib
 
 import yaml
@@ -8,7 +7,7 @@ import yaml
 from bfasst import paths
 from bfasst.design import Design
 from bfasst.flows.flow import get_flow
-from bfasst.types import ToolType
+from bfasst.types import Resource, ToolType
 from bfasst.utils import error
 
 
@@ -37,6 +36,12 @@ class Experiment:
         self.designs = []
         self.__create_design_objects()
 
+        self.resource_capacities = {}
+        self.__read_resources()
+
+        self.timeouts = {}
+        self.__read_timeouts()
+
         self.flow_args = {k: "" for k in ToolType}
         self.__read_tool_types()
 
@@ -103,6 +108,29 @@ class Experiment:
             design = Design(paths.DESIGNS_PATH / design_path, self.work_dir)
             self.designs.append(design)
 
+    def __read_resources(self):
+        """Read the capacity of any limited resources, eg.
+        resources:
+            conformal_license: 2
+            memory_gb: 64
+        """
+        for key, val in self.experiment_props.pop("resources", {}).items():
+            try:
+                self.resource_capacities[Resource[key.upper()]] = val
+            except KeyError:
+                error(f"Experiment {self.yaml_path} has unknown resource {key}")
+
+    def __read_timeouts(self):
+        """Read the time limits (in seconds) for jobs of each tool class, eg.
+        timeouts:
+            VivadoImplementationTool: 3600
+            default: 7200
+        """
+        for key, val in self.experiment_props.pop("timeouts", {}).items():
+            if not isinstance(val, (int, float)) or val <= 0:
+                error(f"Experiment {self.yaml_path} has invalid timeout for {key}: {val}")
+            self.timeouts[key] = val
+
     def __read_tool_types(self):
         for key, val in self.experiment_props.items():
             try:
@@ -125,7 +153,3 @@ class Experiment:
 
     def get_length_of_longest_design_name(self):
         return max(len(str(design.rel_path)) for design in self.designs)
-
-    def init_design_start_times(self, running_list):
-        for design in self.designs:
-            running_list[design.rel_path] = datetime.datetime.now()
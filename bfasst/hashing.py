@@ -0,0 +1,44 @@
+""" Content hashing of files """
+
+import hashlib
+import os
+
+CHUNK_SIZE = 1024 * 1024
+
+# (path, size, mtime_ns) -> sha256, so that unchanged files are hashed at most once per process
+_hash_cache = {}
+
+
+def hash_file(path):
+    """Return the sha256 hex digest of a file's contents"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def file_stamp(path, previous=None):
+    """Return the size, modification time and hash of a file.  The file is not rehashed if its
+    size and modification time match a previous stamp of the file, or an earlier call."""
+    stat = os.stat(path)
+    key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if previous is not None and (previous["size"], previous["mtime_ns"]) == key[1:]:
+        _hash_cache[key] = previous["sha256"]
+    elif key not in _hash_cache:
+        _hash_cache[key] = hash_file(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _hash_cache[key]}
+
+
+def file_matches_stamp(path, stamp):
+    """Return whether a file still has the contents recorded in a file_stamp().  The file is
+    only rehashed if its size matches but its modification time has changed."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return False
+    if stat.st_size != stamp["size"]:
+        return False
+    if stat.st_mtime_ns == stamp["mtime_ns"]:
+        return True
+    return hash_file(path) == stamp["sha256"]
@@ -24,6 +24,7 @@ class ImplementationTool(Tool):
     def cleanup(self):
         """Perform cleanup after the tool has finished running"""
         self.arg_parser = None
+        self.close_log()
 
     def add_args(self):
         """Default arguments for all impl tools"""
@@ -37,6 +38,11 @@ class ImplementationTool(Tool):
     def implement_bitstream(self, netlist_path, build_dir):
         pass
 
+    def output_paths(self):
+        """Files written by implementation besides the bitstream and log, which must be
+        restored with them when a previous run is reused"""
+        return []
+
     def print_running_impl(self):
         self.log("Running implementation")
 
@@ -52,10 +58,9 @@ class ImplementationTool(Tool):
         self.design.constraints_path = self.cwd / "constraints.xdc"
 
         if not self.need_to_rerun(
-            tool_products=[ToolProduct(self.design.bitstream_path, self.log_path, log_check_fcn)],
-            dependency_modified_time=max(
-                pathlib.Path(file).stat().st_mtime, self.design.netlist_path.stat().st_mtime
-            ),
+            tool_products=[ToolProduct(self.design.bitstream_path, self.log_path, log_check_fcn)]
+            + [ToolProduct(path) for path in self.output_paths()],
+            dependencies=[pathlib.Path(file), self.design.netlist_path],
         ):
             self.print_skipping_impl()
             return True
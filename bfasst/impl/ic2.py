@@ -6,7 +6,7 @@ import re
 import os
 
 import bfasst
-from bfasst import paths
+from bfasst import metrics, paths
 from bfasst.impl.base import ImplementationTool, ImplementationException
 
 
@@ -15,6 +15,9 @@ class Ic2ImplementationTool(ImplementationTool):
 
     TOOL_WORK_DIR = "ic2_impl"
 
+    def output_paths(self):
+        return [self.cwd / (self.design.top + ".pcf")]
+
     def implement_bitstream(self):
         self.launch()
         self.design.bitstream_path = self.cwd / (self.design.top + ".bit")
@@ -67,6 +70,7 @@ class Ic2ImplementationTool(ImplementationTool):
         cmd = ["tclsh", tcl_path, self.design.top, ".", netlist_no_ext]
         env = os.environ.copy()
         env["SBT_DIR"] = bfasst.config.IC2_INSTALL_DIR / "sbt_backend"
+        self.flush_log()
         with open(self.log_path, "a") as fp:
             proc = subprocess.run(
                 cmd, stdout=fp, stderr=subprocess.STDOUT, cwd=self.work_dir, env=env
@@ -79,6 +83,7 @@ class Ic2ImplementationTool(ImplementationTool):
         shutil.copyfile(paths.I2C_RESOURCES / "template.tcl", tcl_path)
         return tcl_path
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_impl_status(self, log_path):
         """Check log file for errors"""
         text = open(log_path).read()
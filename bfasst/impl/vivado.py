@@ -5,14 +5,17 @@ import os
 import time
 
 import bfasst
+from bfasst import metrics
 from bfasst.impl.base import ImplementationTool, ImplementationException
 from bfasst.config import VIVADO_COMMAND
+from bfasst.types import Resource
 
 
 class VivadoImplementationTool(ImplementationTool):
     """Run Vivado Implementation"""
 
     TOOL_WORK_DIR = "vivado_impl"
+    RESOURCES = {Resource.MEMORY_GB: 6}
 
     def __init__(self, cwd, design, flow_args=""):
         super().__init__(cwd, design, flow_args)
@@ -26,6 +29,14 @@ class VivadoImplementationTool(ImplementationTool):
         self.design.utilization_path = self.work_dir / "utilization.txt"
         self.design.bitstream_path = self.cwd / (self.design.top + ".bit")
 
+    def output_paths(self):
+        return [
+            self.design.impl_netlist_path,
+            self.design.impl_edif_path,
+            self.design.xilinx_impl_checkpoint_path,
+            self.design.utilization_path,
+        ]
+
     def implement_bitstream(self):
         """Run vivado executable to perform implementation"""
         self.launch()
@@ -89,6 +100,7 @@ class VivadoImplementationTool(ImplementationTool):
                 f"Implementation failed with return code {proc.returncode}"
             )
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_impl_status(self, log_path):
         """Checks the status of Vivado execution for errors"""
         text = open(log_path).read()
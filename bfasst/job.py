@@ -1,8 +1,16 @@
 """Job class for a job function and dependency list"""
 
+import contextlib
+from dataclasses import dataclass, field
+import functools
+import time
+import traceback
 import uuid
 
-from bfasst.tool import BfasstException
+from bfasst import metrics, profiling
+from bfasst.hashing import file_stamp
+from bfasst.output_cntrl import capture_output
+from bfasst.tool import BfasstException, Tool
 
 
 class Job:
@@ -19,12 +27,43 @@ class Job:
         self.dependencies = dependencies
         self.__set_uuid()
 
+        # Identifies the job across runs of an experiment (unlike the uuid)
+        self.key = None
+
     def __set_uuid(self):
         """Set the UUID for this job. The UUID is used to track dependencies
         between jobs and to identify jobs
         while eliminating concerns about pickling across processes in multiprocessing."""
         self.uuid = uuid.uuid4().int
 
+    @property
+    def tool(self):
+        return get_tool(self.function)
+
+    @property
+    def tool_name(self):
+        """Name of the tool and method run by this job, eg. 'VivadoSynthesisTool.create_netlist'"""
+        function = self._unwrapped_function
+        owner = getattr(function, "__self__", None)
+        if isinstance(owner, Job):
+            return owner.tool_name
+        if self.tool is None:
+            return function.__name__
+        return f"{type(self.tool).__name__}.{function.__name__}"
+
+    @property
+    def resources(self):
+        """Resources (licenses, memory, etc.) needed while this job runs"""
+        if self.tool is None:
+            return {}
+        return self.tool.RESOURCES
+
+    @property
+    def _unwrapped_function(self):
+        if isinstance(self.function, functools.partial):
+            return self.function.func
+        return self.function
+
     def invert(self):
         """This can be called in the case where we want to invert the job's exception handling"""
         return Job(self.inverter, self.design_rel_path, self.dependencies)
@@ -33,9 +72,89 @@ class Job:
         try:
             self.function()
         except BfasstException:
+            # Don't let the failed run's products be reused as if it had succeeded
+            tool = get_tool(self.function)
+            if tool is not None:
+                tool.new_fingerprints = []
             return
 
         raise BfasstException("Job succeeded but was expected to fail")
 
     def __eq__(self, other):
         return self.uuid == other.uuid
+
+
+def get_tool(function):
+    """Return the tool object whose method is run by function, or None if the function
+    is not a tool method (eg. a plain function)"""
+    if isinstance(function, functools.partial):
+        function = function.func
+
+    owner = getattr(function, "__self__", None)
+    if isinstance(owner, Job):
+        # Inverted job, return the tool of the job being inverted
+        return get_tool(owner.function)
+    if isinstance(owner, Tool):
+        return owner
+    return None
+
+
+def run_job_function(function):
+    """Call a job's function and, once it succeeds, save the fingerprints of its tool's
+    products so that later runs can reuse them.  Anything the tool prints is added to its
+    log."""
+    tool = get_tool(function)
+    if tool is None:
+        function()
+        return
+
+    try:
+        with capture_output(tool.log_captured_output):
+            function()
+    finally:
+        tool.close_log()
+    tool.save_fingerprints()
+
+
+@dataclass
+class JobResult:
+    """Compact record of a finished job, sent back from the worker that ran it"""
+
+    uuid: int
+    status: str  # Empty string on success
+    runtime: float
+    products: dict = field(default_factory=dict)  # Path -> hashing.file_stamp()
+    metrics: list = field(default_factory=list)  # Phase records, see metrics.phase()
+    worker: str = ""  # metrics.worker_description() of the worker that ran the job
+
+
+def run_job(job_uuid, function, submit_time=None, profile_path=None):
+    """Run a job's function in a worker process.  Only the job's uuid and function (usually a
+    bound tool method) are sent to the worker, not the job graph or the experiment.
+    submit_time (time.time()) is when the job was submitted, to measure its launch time.
+    If profile_path is given, the function is profiled, and its profile written there."""
+    phases = metrics.start_job(submit_time)
+    t_start = time.perf_counter()
+    try:
+        with metrics.phase(metrics.RUN), (
+            profiling.profile(profile_path) if profile_path else contextlib.nullcontext()
+        ):
+            run_job_function(function)
+        status = ""
+    except BfasstException as e:
+        status = f"{type(e).__name__}: {e}\n"
+    except AssertionError:
+        formatted_lines = traceback.format_exc().splitlines()
+        status = f"AssertionErrror: {formatted_lines[-3]}"
+    runtime = time.perf_counter() - t_start
+
+    # Hash the tool's products here, rather than in the main process
+    products = {}
+    tool = get_tool(function)
+    if not status and tool is not None:
+        with metrics.phase(metrics.PRODUCT_WRITE):
+            products = {str(path): file_stamp(path) for path in tool.product_paths()}
+
+    return JobResult(
+        job_uuid, status, runtime, products, list(phases), metrics.worker_description()
+    )
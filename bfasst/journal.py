@@ -0,0 +1,90 @@
+""" Append-only journal of job starts and finishes, used to resume experiments """
+
+import json
+import time
+
+from bfasst.hashing import file_matches_stamp
+
+
+class Journal:
+    """Records when each job of an experiment starts and finishes, along with its status and
+    the hashes of its products, as json lines in the experiment work directory.  Since records
+    are only ever appended, the journal survives the experiment being killed, and a later run
+    can skip the jobs that already completed."""
+
+    FILE_NAME = "journal.jsonl"
+
+    def __init__(self, work_dir):
+        self.path = work_dir / self.FILE_NAME
+        self.fp = None
+
+        # Uuids of jobs to skip, because they completed in a previous run
+        self.resumable = set()
+
+    def __enter__(self):
+        self.fp = open(self.path, "a")
+        return self
+
+    def __exit__(self, *args):
+        self.fp.close()
+
+    def _write(self, record):
+        record["time"] = time.time()
+        self.fp.write(json.dumps(record) + "\n")
+        self.fp.flush()
+
+    def job_started(self, job):
+        self._write({"event": "start", "job": job.key})
+
+    def job_finished(self, job, result):
+        self._write(
+            {
+                "event": "finish",
+                "job": job.key,
+                "status": result.status,
+                "runtime": result.runtime,
+                "products": result.products,
+            }
+        )
+
+    def _completed_job_keys(self):
+        """Keys of jobs whose last run was successful, and whose products are unchanged"""
+        last_finish = {}
+        if self.path.is_file():
+            with open(self.path) as fp:
+                for line in fp:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Partially written record from a killed run
+                        continue
+                    if record["event"] == "finish":
+                        last_finish[record["job"]] = record
+
+        return {
+            key
+            for key, record in last_finish.items()
+            if not record["status"]
+            and all(file_matches_stamp(path, stamp) for path, stamp in record["products"].items())
+        }
+
+    def resume(self, jobs):
+        """Find the jobs that can be skipped when resuming: jobs that completed in a previous
+        run with unchanged products, and whose parent jobs can all be skipped too.  This must
+        be called before the jobs are scheduled, as it relies on their dependencies."""
+        completed_keys = self._completed_job_keys()
+        jobs_by_uuid = {job.uuid: job for job in jobs}
+        resumable = {}
+        for job in jobs:
+            self._check_resumable(job, jobs_by_uuid, completed_keys, resumable)
+        self.resumable = {job_uuid for job_uuid, can_resume in resumable.items() if can_resume}
+
+    def _check_resumable(self, job, jobs_by_uuid, completed_keys, resumable):
+        """Recursive helper to check a job and all of its ancestors"""
+        if job.uuid not in resumable:
+            resumable[job.uuid] = job.key in completed_keys and all(
+                self._check_resumable(jobs_by_uuid[parent], jobs_by_uuid, completed_keys, resumable)
+                for parent in job.dependencies or ()
+                if parent in jobs_by_uuid
+            )
+        return resumable[job.uuid]
@@ -0,0 +1,62 @@
+""" Buffered log file writer and log levels for tools """
+
+from enum import IntEnum
+import os
+
+LOG_LEVEL_ENV = "BFASST_LOG_LEVEL"
+
+
+class LogLevel(IntEnum):
+    """Verbosity of log messages.  Messages above the tool's log level are dropped."""
+
+    INFO = 0
+    DEBUG = 1
+    TRACE = 2  # Per net/pin/candidate detail, for debugging a tool itself
+
+
+DEFAULT_LOG_LEVEL = LogLevel.DEBUG
+
+
+def get_log_level():
+    """Log level set by the BFASST_LOG_LEVEL environment variable (eg. 'trace')"""
+    if LOG_LEVEL_ENV not in os.environ:
+        return DEFAULT_LOG_LEVEL
+    return LogLevel[os.environ[LOG_LEVEL_ENV].upper()]
+
+
+class LogSink:
+    """Writes to a tool's log file through a buffer, keeping the file open between messages,
+    rather than opening, writing and flushing the file for every message.
+
+    The log file can change (tools switch log files between runs), in which case the
+    previous file is closed.  Anything else that reads or writes the log file must flush()
+    or close() the sink first."""
+
+    BUFFER_SIZE = 64 * 1024
+
+    def __init__(self):
+        self.path = None
+        self.fp = None
+
+    def write(self, path, text):
+        if path != self.path:
+            self.close()
+            self.path = path
+        if self.fp is None:
+            self.fp = open(self.path, "a", buffering=self.BUFFER_SIZE)
+        self.fp.write(text)
+
+    def flush(self):
+        if self.fp is not None:
+            self.fp.flush()
+
+    def close(self):
+        if self.fp is not None:
+            self.fp.close()
+            self.fp = None
+
+    def __getstate__(self):
+        # Open files can't be pickled (tools are sent to worker processes), so the copy
+        # reopens the file, after anything buffered here has been written
+        self.flush()
+        return {"path": None, "fp": None}
@@ -0,0 +1,100 @@
+""" Per-job timing and resource metrics, recorded by tool phase """
+
+import contextlib
+import json
+import os
+import resource
+import socket
+import time
+
+# Phases recorded for every job (tools may record others)
+LAUNCH = "launch"  # From the job being submitted to a worker starting it
+RUN = "run"  # The whole job, including the phases below
+UP_TO_DATE_CHECK = "up_to_date_check"
+SUBPROCESS = "subprocess"
+LOG_PARSE = "log_parse"
+PRODUCT_WRITE = "product_write"
+
+# Phase records of the job running in this (worker) process
+_PHASES = []
+
+
+def start_job(submit_time=None):
+    """Start collecting metrics for a new job in this process, and record how long it took
+    to launch, if the time (time.time()) it was submitted is known.  Returns the list that
+    the job's phase records are appended to."""
+    _PHASES.clear()
+    _reset_peak_rss()
+    if submit_time is not None:
+        _PHASES.append({"phase": LAUNCH, "start": submit_time, "wall": time.time() - submit_time})
+    return _PHASES
+
+
+def _reset_peak_rss():
+    """Reset the peak RSS of this process, so that a long-lived worker reports the peak of
+    each job, rather than the largest job it has run.  This is only possible on Linux."""
+    try:
+        with open("/proc/self/clear_refs", "w") as fp:
+            fp.write("5")
+    except OSError:
+        pass
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Record the wall time, CPU time and peak RSS of a block, or of each call of a decorated
+    function, as a phase of the current job.  Yields the phase record, so the block can add
+    to it (eg. exec_and_log records the exact peak RSS of the command it ran)."""
+    self_start = resource.getrusage(resource.RUSAGE_SELF)
+    children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+    record = {"phase": name, "start": time.time()}
+    t_start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        self_end = resource.getrusage(resource.RUSAGE_SELF)
+        children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+        record["wall"] = time.perf_counter() - t_start
+        record["cpu"] = _cpu_time(self_end) - _cpu_time(self_start)
+        record["child_cpu"] = _cpu_time(children_end) - _cpu_time(children_start)
+        record["peak_rss_kb"] = self_end.ru_maxrss
+        if "child_peak_rss_kb" not in record:
+            # A new high-water mark must have come from a child that ran during the phase,
+            # otherwise the peak of those children isn't known
+            grew = children_end.ru_maxrss > children_start.ru_maxrss
+            record["child_peak_rss_kb"] = children_end.ru_maxrss if grew else None
+        _PHASES.append(record)
+
+
+def _cpu_time(usage):
+    return usage.ru_utime + usage.ru_stime
+
+
+class MetricsLog:
+    """Appends the phase metrics of each finished job as a json line to metrics.jsonl in the
+    experiment work directory, to find which tools and designs take the most time and
+    memory, and to compare runs."""
+
+    FILE_NAME = "metrics.jsonl"
+
+    def __init__(self, work_dir):
+        self.path = work_dir / self.FILE_NAME
+
+    def record(self, job, result):
+        """Append the metrics of a finished job"""
+        record = {
+            "time": time.time(),
+            "job": job.key,
+            "design": str(job.design_rel_path),
+            "tool": job.tool_name,
+            "status": result.status,
+            "runtime": result.runtime,
+            "phases": result.metrics,
+        }
+        with open(self.path, "a") as fp:
+            fp.write(json.dumps(record) + "\n")
+
+
+def worker_description():
+    """Identifies the worker process (and machine) that ran a job"""
+    return f"{socket.gethostname()}:{os.getpid()}"
@@ -27,33 +27,20 @@ from bfasst.netlist_mapping.functional.logic_functions_mapping import map_ffs_ba
 from bfasst.netlist_mapping.functional.netlist_flipflops_data import get_ffs_and_conf_bits
 
 
-def map_netlists(golden_netlist_arg, reversed_netlist_arg):
-    """Maps the golden and reversed netlist based on block chains and functional trees"""
-    print(f"golden: {golden_netlist_arg} reversed: {reversed_netlist_arg}")
-    # Loads the first netlist as intermediate representation (ccl_ir1)
-    ccl_ir1 = sdn.parse(golden_netlist_arg)
-
-    # Get the first library in the netlist
-    library1 = ccl_ir1.libraries[0]
-
-    # Loads the second netlist as intermediate representation (ccl_ir2)
-    ccl_ir2 = sdn.parse(reversed_netlist_arg)
-
-    # Get the second library in the netlist
-    library2 = ccl_ir2.libraries[0]
+def map_libraries(library1, library2):
+    """Maps the flipflops of the golden and reversed libraries based on block chains and
+    functional trees.  Returns the flipflops mapped structurally, and those mapped
+    functionally."""
 
     # Structurally map flipflops
     structurally_mapped_ffs = []
 
     # Get mapped carries and flipflops from the counters
-    carry_chain_mapped_flipflops = []
     carry_chain_mapped_flipflops = map_carries_and_ffs(library1, library2)
 
     structurally_mapped_ffs += carry_chain_mapped_flipflops
 
     # Get mapped flipflops from the shift-register and its output
-    shift_register_and_output_flipflops = []
-
     shift_register_and_output_flipflops = map_shift_register_and_output_ffs(library1, library2)
 
     structurally_mapped_ffs += shift_register_and_output_flipflops
@@ -73,6 +60,26 @@ def map_netlists(golden_netlist_arg, reversed_netlist_arg):
     # Map Netlists based on the flipflops data (flipflop name, configuration bits, sop)
     func_mapped_ffs = map_ffs_based_on_logic_func(netlist_ffs_data_1, netlist_ffs_data_2)
 
+    return structurally_mapped_ffs, func_mapped_ffs
+
+
+def map_netlists(golden_netlist_arg, reversed_netlist_arg):
+    """Maps the golden and reversed netlist based on block chains and functional trees"""
+    print(f"golden: {golden_netlist_arg} reversed: {reversed_netlist_arg}")
+    # Loads the first netlist as intermediate representation (ccl_ir1)
+    ccl_ir1 = sdn.parse(golden_netlist_arg)
+
+    # Get the first library in the netlist
+    library1 = ccl_ir1.libraries[0]
+
+    # Loads the second netlist as intermediate representation (ccl_ir2)
+    ccl_ir2 = sdn.parse(reversed_netlist_arg)
+
+    # Get the second library in the netlist
+    library2 = ccl_ir2.libraries[0]
+
+    structurally_mapped_ffs, func_mapped_ffs = map_libraries(library1, library2)
+
     # Print the Mapped Points File to be used by Conformal
     print_conformal_input_output_points(
         ccl_ir1.top_instance,
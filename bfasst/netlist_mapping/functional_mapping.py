@@ -22,6 +22,26 @@ from bfasst.netlist_mapping.functional.logic_functions_mapping import map_ffs_ba
 from bfasst.netlist_mapping.functional.netlist_flipflops_data import get_ffs_and_conf_bits
 
 
+def functionally_map_libraries(library1, library2):
+    """Maps the flipflops of the golden and reversed libraries through the functional trees
+    before each ff.  Returns the flipflops mapped through carry chains, and those mapped
+    functionally."""
+
+    # Get mapped carries and flipflops from the counters
+    carry_chain_mapped_flipflops = map_carries_and_ffs(library1, library2)
+
+    # Filling the first flipflops data object
+    netlist_ffs_data_1 = get_ffs_and_conf_bits(library1, carry_chain_mapped_flipflops, True)
+
+    # Filling the second flipflops data object
+    netlist_ffs_data_2 = get_ffs_and_conf_bits(library2, carry_chain_mapped_flipflops, False)
+
+    # Map Netlists based on the flipflops data (flipflop name, configuration bits, sop)
+    functionally_mapped_ffs = map_ffs_based_on_logic_func(netlist_ffs_data_1, netlist_ffs_data_2)
+
+    return carry_chain_mapped_flipflops, functionally_mapped_ffs
+
+
 def functionally_map_netlists(golden_netlist_arg, reversed_netlist_arg):
     """Maps golden and reversed netlists through the functional trees before each ff"""
 
@@ -37,18 +57,9 @@ def functionally_map_netlists(golden_netlist_arg, reversed_netlist_arg):
     # Get the second library in the netlist
     library2 = ir2.libraries[0]
 
-    # Get mapped carries and flipflops from the counters
-    carry_chain_mapped_flipflops = []
-    carry_chain_mapped_flipflops = map_carries_and_ffs(library1, library2)
-
-    # Filling the first flipflops data object
-    netlist_ffs_data_1 = get_ffs_and_conf_bits(library1, carry_chain_mapped_flipflops, True)
-
-    # Filling the second flipflops data object
-    netlist_ffs_data_2 = get_ffs_and_conf_bits(library2, carry_chain_mapped_flipflops, False)
-
-    # Map Netlists based on the flipflops data (flipflop name, configuration bits, sop)
-    functionally_mapped_ffs = map_ffs_based_on_logic_func(netlist_ffs_data_1, netlist_ffs_data_2)
+    carry_chain_mapped_flipflops, functionally_mapped_ffs = functionally_map_libraries(
+        library1, library2
+    )
 
     # Print the Mapped Points File to be used by Conformal
     print_conformal_input_output_points(
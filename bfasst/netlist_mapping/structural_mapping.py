@@ -24,6 +24,20 @@ from bfasst.netlist_mapping.structural.netlist import get_netlist
 from bfasst.netlist_mapping.structural.automated_block_mapping import automatically_map_blocks
 
 
+def structurally_map_libraries(library1, library2):
+    """Map the golden and reversed libraries through automated block mapping.  Returns the
+    mapped points."""
+
+    # Get netlists for the structural mapping algorithm
+    golden_netlist = get_netlist(library1)
+    reversed_netlist = get_netlist(library2)
+
+    # Structurally map the rest of the netlists
+    mapped_blocks = 0
+    mapped_points = []
+    return automatically_map_blocks(golden_netlist, reversed_netlist, mapped_points, mapped_blocks)
+
+
 def structurally_map_netlists(golden_netlist_arg, reversed_netlist_arg):
     """Map the golden and reversed netlists through automated block mapping"""
 
@@ -39,16 +53,7 @@ def structurally_map_netlists(golden_netlist_arg, reversed_netlist_arg):
     # Get the first library in the netlist
     library2 = ir2.libraries[0]
 
-    # Get netlists for the structural mapping algorithm
-    golden_netlist = get_netlist(library1)
-    reversed_netlist = get_netlist(library2)
-
-    # Structurally map the rest of the netlists
-    mapped_blocks = 0
-    mapped_points = []
-    mapped_points = automatically_map_blocks(
-        golden_netlist, reversed_netlist, mapped_points, mapped_blocks
-    )
+    mapped_points = structurally_map_libraries(library1, library2)
 
     # Print the Mapped Points File to be used by Conformal
     print_conformal_input_output_points(
@@ -2,7 +2,6 @@
 
 
 from abc import abstractmethod
-import pathlib
 import shutil
 import subprocess
 
@@ -27,9 +26,7 @@ class Ic2BaseOptTool(OptTool):
                 tool_products=[
                     ToolProduct(self.design.netlist_path, self.log_path, self.check_opt_log)
                 ],
-                dependency_modified_time=max(
-                    pathlib.Path(__file__).stat().st_mtime, self.design.last_modified_time()
-                ),
+                dependencies=self.design.source_paths(),
             )
             and not force_run
         ):
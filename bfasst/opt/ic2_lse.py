@@ -6,7 +6,7 @@ import os.path
 import in_place
 
 import bfasst
-from bfasst import paths
+from bfasst import metrics, paths
 from bfasst.opt.base import OptException
 from bfasst.opt.ic2_base import Ic2BaseOptTool
 from bfasst.utils import error
@@ -59,6 +59,7 @@ class Ic2LseOptTool(Ic2BaseOptTool):
         #   @echo "-output_edif ../../$(IC2_EDIF_FILE)" >> $@
         return project_file
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_opt_log(self, synth_log):
         """check optimization log for errors"""
         text = open(synth_log).read()
@@ -4,7 +4,7 @@ import re
 import os
 
 import bfasst
-from bfasst import paths
+from bfasst import metrics, paths
 from bfasst.design import Design
 from bfasst.opt.ic2_base import Ic2BaseOptTool
 from bfasst.opt.base import OptException
@@ -70,6 +70,7 @@ class Ic2SynplifyOptTool(Ic2BaseOptTool):
         # 	@echo "-output_edif ../../$(IC2_EDIF_FILE)" >> $@
         return project_file
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_opt_log(self, synth_log):
         """Check log for errors"""
         text = open(synth_log).read()
@@ -1,96 +1,55 @@
-import sys
-import threading
-from io import StringIO
-from werkzeug import local
-
-# Save all of the objects for use later.
-orig___stdout__ = sys.__stdout__
-orig___stderr__ = sys.__stderr__
-orig_stdout = sys.stdout
-orig_stderr = sys.stderr
-thread_proxies = {}
-
-
-def redirect():
-    """
-    Enables the redirect for the current thread's output to a single cStringIO
-    object and returns the object.
-
-    :return: The StringIO object.
-    :rtype: ``io.StringIO``
-    """
-    # Get the current thread's identity.
-    ident = threading.current_thread().ident
+""" Captures the stdout and stderr of jobs, including output from native code """
 
-    # Enable the redirect and return the cStringIO object.
-    thread_proxies[ident] = StringIO()
-    return thread_proxies[ident]
+import contextlib
+import ctypes
+import os
+import sys
+import tempfile
 
+# Original stdout and stderr file descriptors, and the capture file, set by install()
+_SAVED_FDS = None
+_CAPTURE_FILE = None
 
-def cleanup_redirect():
-    """
-    Disables the redirect for the current thread's output to a single cStringIO
-    object and returns the object.
+# The C library, to flush output buffered by native code
+_LIBC = ctypes.CDLL(None)
 
-    :return: The final string value.
-    :rtype: ``str``
-    """
-    # Get the current thread's identity.
-    ident = threading.current_thread().ident
 
-    # Only act on proxied threads.
-    if ident not in thread_proxies:
+def install():
+    """Set up output capture for this process.  This is done once per worker process, after
+    which capturing a job's output costs two dup2() calls, and nothing per write."""
+    global _SAVED_FDS, _CAPTURE_FILE  # pylint: disable=global-statement
+    if _SAVED_FDS is not None:
         return
-
-    thread_proxies[ident].close()
-    del thread_proxies[ident]
-
-
-def _get_stream(original):
-    """
-    Returns the inner function for use in the LocalProxy object.
-
-    :param original: The stream to be returned if thread is not proxied.
-    :type original: ``file``
-    :return: The inner function for use in the LocalProxy object.
-    :rtype: ``function``
-    """
-
-    def proxy():
-        """
-        Returns the original stream if the current thread is not proxied,
-        otherwise we return the proxied item.
-
-        :return: The stream object for the current thread.
-        :rtype: ``file``
-        """
-        # Get the current thread's identity.
-        ident = threading.current_thread().ident
-
-        # Return the proxy, otherwise return the original.
-        return thread_proxies.get(ident, original)
-
-    # Return the inner function.
-    return proxy
-
-
-def enable_proxy():
-    """
-    Overwrites __stdout__, __stderr__, stdout, and stderr with the proxied
-    objects.
-    """
-    sys.__stdout__ = local.LocalProxy(_get_stream(sys.__stdout__))
-    # sys.__stderr__ = local.LocalProxy(_get_stream(sys.__stderr__))
-    sys.stdout = local.LocalProxy(_get_stream(sys.stdout))
-    # sys.stderr = local.LocalProxy(_get_stream(sys.stderr))
-
-
-def disable_proxy():
-    """
-    Overwrites __stdout__, __stderr__, stdout, and stderr with the original
-    objects.
-    """
-    sys.__stdout__ = orig___stdout__
-    # sys.__stderr__ = orig___stderr__
-    sys.stdout = orig_stdout
-    # sys.stderr = orig_stderr
+    _SAVED_FDS = (os.dup(1), os.dup(2))
+    _CAPTURE_FILE = tempfile.TemporaryFile()
+
+
+def _flush():
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _LIBC.fflush(None)
+
+
+@contextlib.contextmanager
+def capture_output(write):
+    """Redirect the stdout and stderr file descriptors of this process to a file while the
+    block runs, so that prints, subprocesses that inherit them, and native code (eg. the
+    JVM) are all captured.  Afterwards, write(text) is called with the captured output,
+    if there is any."""
+    install()
+    _flush()
+    os.dup2(_CAPTURE_FILE.fileno(), 1)
+    os.dup2(_CAPTURE_FILE.fileno(), 2)
+    try:
+        yield
+    finally:
+        _flush()
+        os.dup2(_SAVED_FDS[0], 1)
+        os.dup2(_SAVED_FDS[1], 2)
+
+        _CAPTURE_FILE.seek(0)
+        text = _CAPTURE_FILE.read().decode(errors="replace")
+        _CAPTURE_FILE.seek(0)
+        _CAPTURE_FILE.truncate()
+        if text:
+            write(text)
@@ -0,0 +1,45 @@
+""" Opt-in profiling (cProfile) of the tool methods run by an experiment's jobs """
+
+import contextlib
+import cProfile
+import pstats
+
+# Profile file of each job, in its tool's work directory, named by the tool method it ran
+PROFILE_SUFFIX = ".prof"
+
+
+def profile_path(job, tool_names):
+    """Where to write the profile of a job, if its tool is one of tool_names (class names, or
+    the names of base classes, such as CompareTool), or None if it shouldn't be profiled"""
+    tool = job.tool
+    if tool is None:
+        return None
+    class_names = {cls.__name__ for cls in type(tool).__mro__}
+    if "all" not in tool_names and class_names.isdisjoint(tool_names):
+        return None
+    method = job.tool_name.rsplit(".", 1)[-1]
+    return tool.work_dir / f"{method}{PROFILE_SUFFIX}"
+
+
+@contextlib.contextmanager
+def profile(path):
+    """Profile a block with cProfile, writing the stats to path (see pstats) even if the
+    block raises"""
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def merge_profiles(paths):
+    """Merge profile files (written by profile()) into one pstats.Stats"""
+    stats = None
+    for path in paths:
+        if stats is None:
+            stats = pstats.Stats(str(path))
+        else:
+            stats.add(str(path))
+    return stats
@@ -1,10 +1,9 @@
 """ X-ray bitstream to netlist tool"""
 import os
 import re
-import pathlib
 
 from bfasst.reverse_bit.base import ReverseBitTool, ReverseBitException
-from bfasst import paths, config
+from bfasst import paths, config, metrics
 from bfasst.tool import ToolProduct
 
 
@@ -49,12 +48,12 @@ class XRayReverseBitTool(ReverseBitTool):
             self.design.reversed_netlist_path = self.cwd / (
                 self.design.top + "_" + self.design.cur_error_flow_name + "_reversed.v"
             )
+        xdc_path = self.work_dir / (self.design.top + "_reversed.xdc")
+        generate_xdc = ToolProduct(xdc_path)
 
         if not self.need_to_rerun(
-            [generate_fasm, generate_netlist],
-            dependency_modified_time=max(
-                pathlib.Path(__file__).stat().st_mtime, self.design.bitstream_path.stat().st_mtime
-            ),
+            [generate_fasm, generate_netlist, generate_xdc],
+            dependencies=[self.design.bitstream_path],
         ):
             self.print_skipping_reverse_bit()
             return
@@ -65,7 +64,6 @@ class XRayReverseBitTool(ReverseBitTool):
         self.convert_bit_to_fasm(self.design.bitstream_path, fasm_path)
 
         # fasm to netlist
-        xdc_path = self.work_dir / (self.design.top + "_reversed.xdc")
         self.design.constraints_path = self.cwd / "constraints.xdc"
         try:
             self.convert_fasm_to_netlist(
@@ -133,6 +131,7 @@ class XRayReverseBitTool(ReverseBitTool):
         if proc.returncode:
             raise ReverseBitException("Failed to convert FASM to netlist")
 
+    @metrics.phase(metrics.LOG_PARSE)
     def to_netlist_log_parser(self, log_path):
         """Parse the 'To netlist' log file for errors"""
         text = open(log_path).read()
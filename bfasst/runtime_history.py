@@ -0,0 +1,48 @@
+""" Historical per-design, per-tool job runtimes, used to prioritize jobs """
+
+import json
+import statistics
+
+
+class RuntimeHistory:
+    """Tracks how long each tool took to run on each design in previous runs
+    of an experiment.  The history is stored as a json file in the experiment work
+    directory, and is used to estimate how much work is left downstream of a job."""
+
+    FILE_NAME = "runtimes.json"
+
+    # Estimate (in seconds) used for a tool that has never been run
+    DEFAULT_RUNTIME = 1.0
+
+    def __init__(self, work_dir):
+        self.path = work_dir / self.FILE_NAME
+        # design -> tool name -> runtime in seconds
+        self.runtimes = {}
+        if self.path.is_file():
+            with open(self.path) as fp:
+                self.runtimes = json.load(fp)
+
+    def estimate(self, job):
+        """Estimate the runtime of a job.  If this tool has never been run on this design,
+        fall back to the average for this tool across all designs."""
+        tool_name = job.tool_name
+        runtime = self.runtimes.get(str(job.design_rel_path), {}).get(tool_name)
+        if runtime is not None:
+            return runtime
+
+        other_designs = [
+            runtimes[tool_name] for runtimes in self.runtimes.values() if tool_name in runtimes
+        ]
+        if other_designs:
+            return statistics.mean(other_designs)
+        return self.DEFAULT_RUNTIME
+
+    def record(self, job, runtime):
+        """Record the runtime of a job.  The longest runtime seen is kept, so that a quick
+        rerun of an up-to-date tool doesn't hide how expensive the tool really is."""
+        design_runtimes = self.runtimes.setdefault(str(job.design_rel_path), {})
+        design_runtimes[job.tool_name] = max(runtime, design_runtimes.get(job.tool_name, 0.0))
+
+    def save(self):
+        with open(self.path, "w") as fp:
+            json.dump(self.runtimes, fp, indent=2, sort_keys=True)
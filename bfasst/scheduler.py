@@ -0,0 +1,157 @@
+""" Event-driven scheduler for the job DAG of an experiment """
+
+from collections import Counter
+import heapq
+import itertools
+import os
+
+from bfasst.tool import BfasstException
+from bfasst.types import Resource
+
+
+class SchedulerException(BfasstException):
+    """Raised when the job graph cannot be scheduled"""
+
+
+def default_resource_capacities():
+    """Resource capacities used unless overridden by the experiment.  Resources that are
+    not listed here are unlimited."""
+    physical_memory_gb = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") / 1024**3
+    return {
+        Resource.CONFORMAL_LICENSE: 1,
+        Resource.ONESPIN_LICENSE: 1,
+        Resource.MEMORY_GB: physical_memory_gb,
+    }
+
+
+class Scheduler:
+    """Tracks the job DAG of an experiment and releases each job as soon as its
+    last parent has finished, rather than waiting for a whole wave of jobs.
+
+    When more jobs are ready than can be run, jobs with the most estimated work remaining
+    downstream of them (ie. the longest critical path) are handed out first.  A job is only
+    handed out once the resources it needs (licenses, memory, etc.) are available, but lighter
+    jobs behind it in the queue can still go ahead of it."""
+
+    def __init__(self, jobs, runtime_history=None, resource_capacities=None):
+        # Pending jobs (not yet finished), in their original order
+        self.jobs = {}
+        # Parent job uuid -> child jobs
+        self.children = {}
+        # Heap of (-priority, order, job) for jobs that are ready, but not handed out yet
+        self.ready = []
+        self.order = itertools.count()
+        # Uuids of jobs that have been handed out but have not finished
+        self.running = set()
+
+        self.resource_capacities = default_resource_capacities()
+        self.resource_capacities.update(resource_capacities or {})
+        self.resources_in_use = Counter()
+
+        for job in jobs:
+            job.dependencies = set(job.dependencies or ())
+            self.jobs[job.uuid] = job
+
+        for job in jobs:
+            for dependency in job.dependencies:
+                self.children.setdefault(dependency, []).append(job)
+
+        # Job uuid -> estimated runtime of the job plus its longest chain of descendants
+        self.priorities = {}
+        for job in jobs:
+            self._compute_priority(job, runtime_history)
+
+        for job in jobs:
+            if not job.dependencies:
+                self._push_ready(job)
+
+    @property
+    def done(self):
+        return not self.jobs
+
+    def _compute_priority(self, job, runtime_history):
+        """Estimate the work remaining on the critical path starting at this job"""
+        if job.uuid in self.priorities:
+            return self.priorities[job.uuid]
+
+        runtime = runtime_history.estimate(job) if runtime_history else 1.0
+        downstream = [
+            self._compute_priority(child, runtime_history)
+            for child in self.children.get(job.uuid, ())
+        ]
+        self.priorities[job.uuid] = runtime + max(downstream, default=0.0)
+        return self.priorities[job.uuid]
+
+    def _push_ready(self, job):
+        heapq.heappush(self.ready, (-self.priorities[job.uuid], next(self.order), job))
+
+    def _resource_demand(self, job):
+        """Resources needed by a job.  A job can never need more than the full capacity
+        of a resource, otherwise it could never run."""
+        return {
+            resource: min(amount, self.resource_capacities.get(resource, amount))
+            for resource, amount in job.resources.items()
+        }
+
+    def _resources_available(self, job):
+        return all(
+            self.resources_in_use[resource] + amount
+            <= self.resource_capacities.get(resource, float("inf"))
+            for resource, amount in self._resource_demand(job).items()
+        )
+
+    def pop_ready_jobs(self, max_jobs=None):
+        """Return up to max_jobs of the ready jobs with the longest critical path, whose
+        resources are available, and mark them as running"""
+        ready = []
+        waiting_for_resources = []
+        while self.ready and (max_jobs is None or len(ready) < max_jobs):
+            item = heapq.heappop(self.ready)
+            job = item[2]
+            if not self._resources_available(job):
+                waiting_for_resources.append(item)
+                continue
+            self.resources_in_use.update(self._resource_demand(job))
+            ready.append(job)
+
+        for item in waiting_for_resources:
+            heapq.heappush(self.ready, item)
+        self.running.update(job.uuid for job in ready)
+
+        if not ready and not self.running and not self.ready and self.jobs:
+            raise SchedulerException(
+                f"{len(self.jobs)} job(s) have dependencies that can never be satisfied"
+            )
+        return ready
+
+    def job_finished(self, job_uuid, status):
+        """Mark a job as finished.  If the job was successful, any children that no longer
+        have unfinished parents become ready.  If the job failed, that branch of the
+        job tree is trimmed, and the list of removed descendant jobs is returned."""
+        self.running.discard(job_uuid)
+        finished_job = self.jobs.pop(job_uuid, None)
+        if finished_job is None:
+            raise SchedulerException("Finished job not found in jobs list")
+        self.resources_in_use.subtract(self._resource_demand(finished_job))
+
+        # Release any children that were only waiting on this job
+        if not status:
+            for child in self.children.pop(job_uuid, ()):
+                child.dependencies.discard(job_uuid)
+                if not child.dependencies and child.uuid in self.jobs:
+                    self._push_ready(child)
+            return []
+
+        # If the job failed, trim that branch of the job tree
+        jobs_removed = []
+        self._remove_children_recursive(finished_job, jobs_removed)
+        return jobs_removed
+
+    def _remove_children_recursive(self, curr_job, jobs_removed):
+        """Recursive helper to remove all descendants of a failed job"""
+        for child in self.children.pop(curr_job.uuid, ()):
+            if self.jobs.pop(child.uuid, None) is None:
+                # Already removed through another parent
+                continue
+            jobs_removed.append(child)
+            self._remove_children_recursive(child, jobs_removed)
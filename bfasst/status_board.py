@@ -0,0 +1,150 @@
+""" Live status of a running experiment, on the terminal and as a json file """
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+# Event types sent from the job runner to the status board's refresher thread
+JOB_STARTED = "started"
+JOB_FINISHED = "finished"
+JOBS_REMOVED = "removed"
+
+
+class StatusBoard:
+    """Shows which designs are running, and the status of each job that fails, as the
+    experiment runs.  Optionally, a snapshot of the experiment (job counts and running jobs)
+    is also kept in a json file, for monitoring the experiment from outside.
+
+    The job runner reports job starts and finishes as events.  A single refresher thread
+    applies the events and redraws the status (at least every print_period seconds), so the
+    job runner never waits on the terminal, and there's no state shared between processes."""
+
+    # Designs shown on the running line
+    MAX_DESIGNS_SHOWN = 6
+
+    def __init__(self, num_jobs, ljust, print_period=1, status_json_path=None):
+        self.num_jobs = num_jobs
+        self.ljust = ljust
+        self.print_period = print_period
+        self.status_json_path = status_json_path
+        self.events = queue.Queue()
+        self.thread = None
+        self.t_start = time.time()
+
+        # State below is only touched by the refresher thread, until it is stopped
+        # Status of each finished job ("" on success), in the order they finished
+        self.statuses = []
+        # Running job uuid -> (job, time it started)
+        self.running = {}
+
+    def __enter__(self):
+        self.thread = threading.Thread(target=self._refresh, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.events.put(None)
+        self.thread.join()
+
+    def job_started(self, job):
+        self.events.put((JOB_STARTED, job, time.time()))
+
+    def job_finished(self, job, status):
+        self.events.put((JOB_FINISHED, job, status))
+
+    def jobs_removed(self, jobs):
+        """Report jobs that won't run because a job they depend on failed"""
+        self.events.put((JOBS_REMOVED, jobs, None))
+
+    def _refresh(self):
+        """Main loop of the refresher thread"""
+        while True:
+            try:
+                event = self.events.get(timeout=self.print_period or None)
+            except queue.Empty:
+                # Tick, so that running times are updated
+                self._draw()
+                continue
+            if event is None:
+                self._clear_running_line()
+                self._write_status_json()
+                return
+            self._apply(event)
+            # Apply any other events that are waiting before redrawing
+            if self.events.empty():
+                self._draw()
+
+    def _apply(self, event):
+        kind, job, value = event
+        if kind == JOB_STARTED:
+            self.running[job.uuid] = (job, value)
+        elif kind == JOB_FINISHED:
+            self.running.pop(job.uuid, None)
+            self.statuses.append(value)
+            if value:
+                self._clear_running_line()
+                sys.stdout.write(str(job.design_rel_path.name).ljust(self.ljust))
+                sys.stdout.write(str(value))
+        elif kind == JOBS_REMOVED:
+            self.statuses.extend("Parent job failed" for _ in job)
+
+    def _draw(self):
+        if self.print_period:
+            self._draw_running_line()
+        self._write_status_json()
+
+    def _clear_running_line(self):
+        sys.stdout.write("\r\033[K")
+        sys.stdout.flush()
+
+    def _draw_running_line(self):
+        """Show the running designs, and how long since their first running job started"""
+        now = time.time()
+        design_start_times = {}
+        for job, start_time in self.running.values():
+            design = job.design_rel_path
+            design_start_times[design] = min(start_time, design_start_times.get(design, now))
+
+        sys.stdout.write("\r\033[K")
+        sys.stdout.write("Running: ")
+        for design, start_time in list(design_start_times.items())[: self.MAX_DESIGNS_SHOWN]:
+            sys.stdout.write(f"{design.name[:8]} ({format_duration(now - start_time)}) ")
+        if len(design_start_times) > self.MAX_DESIGNS_SHOWN:
+            sys.stdout.write("...")
+        sys.stdout.flush()
+
+    def _write_status_json(self):
+        """Replace the status json file with a snapshot of the experiment"""
+        if self.status_json_path is None:
+            return
+        now = time.time()
+        snapshot = {
+            "time": now,
+            "elapsed": now - self.t_start,
+            "total_jobs": self.num_jobs,
+            "finished_jobs": len(self.statuses),
+            "failed_jobs": sum(1 for status in self.statuses if status),
+            "running_jobs": [
+                {
+                    "job": job.key,
+                    "design": str(job.design_rel_path),
+                    "tool": job.tool_name,
+                    "elapsed": now - start_time,
+                }
+                for job, start_time in self.running.values()
+            ],
+        }
+        tmp_path = f"{self.status_json_path}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(snapshot, fp, indent=2)
+        os.replace(tmp_path, self.status_json_path)
+
+
+def format_duration(seconds):
+    """Format a duration as h:mm:ss"""
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02}:{seconds:02}"
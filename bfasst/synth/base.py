@@ -23,6 +23,7 @@ class SynthesisTool(tool.Tool):
     def cleanup(self):
         """Perform cleanup after the tool has finished running"""
         self.arg_parser = None
+        self.close_log()
 
     def add_args(self):
         """Default arguments for all synth tools"""
@@ -1,14 +1,15 @@
 """ This file provides tools to wrap Vivado for synthesis purposes """
 
 import re
-import pathlib
 
 import bfasst
+from bfasst import metrics
 from bfasst.design import HdlType
 from bfasst.synth.base import SynthesisTool, SynthesisException
 from bfasst.synth import vivado_ioparse
 from bfasst.config import VIVADO_COMMAND
 from bfasst.tool import ToolProduct
+from bfasst.types import Resource
 
 
 def xdc_line(pin):
@@ -34,6 +35,7 @@ class VivadoSynthesisTool(SynthesisTool):
     """A wrapper around vivado, for use in synthesizing designs"""
 
     TOOL_WORK_DIR = "vivado_synth"
+    RESOURCES = {Resource.MEMORY_GB: 4}
 
     def up_to_date(self):
         """Check if synthesis has already been run"""
@@ -54,9 +56,7 @@ class VivadoSynthesisTool(SynthesisTool):
 
         out_of_date = self.need_to_rerun(
             tool_products,
-            dependency_modified_time=max(
-                pathlib.Path(__file__).stat().st_mtime, self.design.last_modified_time()
-            ),
+            dependencies=self.design.source_paths(),
         )
 
         self.cleanup()
@@ -157,6 +157,7 @@ class VivadoSynthesisTool(SynthesisTool):
         if proc.returncode:
             raise SynthesisException(f"Vivado synthesis failed with return code {proc.returncode}")
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_synth_log(self, log_path):
         with open(log_path) as log_file:
             text = log_file.read()
@@ -2,15 +2,24 @@
 
 import abc
 import argparse
+import codecs
 import datetime
+import hashlib
+import itertools
+import json
+import os
 import pathlib
+import selectors
 import shlex
-from shutil import copyfileobj
 import subprocess
 import sys
+import time
 import types
 from dataclasses import dataclass
-from bfasst.output_cntrl import cleanup_redirect, enable_proxy, redirect
+from bfasst import config, metrics
+from bfasst.artifact_cache import ArtifactCache, get_artifact_cache
+from bfasst.hashing import file_stamp
+from bfasst.log_sink import LogLevel, LogSink, get_log_level
 
 from bfasst.utils import TermColor
 
@@ -30,7 +39,7 @@ class ToolProduct:
     check_log_fcn: types.FunctionType = None
 
 
-class Tool(abc.ABC):
+class Tool(abc.ABC):  # pylint: disable=too-many-public-methods
     """Base class for all tools used in BFASST"""
 
     TERM_COLOR_STAGE = TermColor.PURPLE
@@ -39,12 +48,21 @@ class Tool(abc.ABC):
     TIME_FORMAT = "%H:%M:%S"
     TIMESTAMP_FORMAT = DATE_FORMAT + " " + TIME_FORMAT + ".%f\t"
 
+    # Bytes read from a command's output pipes at a time (see exec_and_log)
+    EXEC_CHUNK_SIZE = 64 * 1024
+
+    # Resources (bfasst.types.Resource -> amount) this tool needs while it runs.  Jobs are only
+    # started when their resources are available (see the experiment 'resources' option).
+    RESOURCES = {}
+
     def __init__(self, cwd, design=None):
         super().__init__()
         self.cwd = cwd
         self.design = design
         self.work_dir = self.make_work_dir()
         self.log_path = self.work_dir / "log.txt"
+        self.log_sink = LogSink()
+        self.log_level = get_log_level()
 
         # Argument parser
         self.arg_parser = None
@@ -52,6 +70,12 @@ class Tool(abc.ABC):
         # Arguments (after parsing)
         self.args = None
 
+        # Products checked by need_to_rerun, recorded in the experiment journal
+        self.tool_products = []
+
+        # (ToolProducts, fingerprint, artifact cache key) to save once a rerun succeeds
+        self.new_fingerprints = []
+
     @property
     @classmethod
     @abc.abstractclassmethod
@@ -65,6 +89,7 @@ class Tool(abc.ABC):
         This method need only be called in the constructors of
         child tools that will be used multiple times in a single flow.
         """
+        self.close_log()
         for log in self.work_dir.iterdir():
             if log.is_file():
                 log.unlink()
@@ -96,19 +121,64 @@ class Tool(abc.ABC):
     def log_title(self, *msg):
         self.log(f"{'='*80}\n{' '.join(str(s) for s in msg)}\n{'='*80}")
 
-    def log(self, *msg, add_timestamp=False):
-        """Write text to the log file and stdout"""
-        with open(self.log_path, "a") as log_fp:
-            text = " ".join(str(s) for s in msg)
-            if add_timestamp:
-                time_now = datetime.datetime.now()
-                text = time_now.strftime(Tool.TIMESTAMP_FORMAT) + text
-            # print(text)
-            log_fp.write(f"{text}\n")
-            log_fp.flush()
-
-    def need_to_rerun(self, tool_products, dependency_modified_time):
-        """Determines whether previous run data can be reused or if the tool needs to be rerun."""
+    def log(self, *msg, add_timestamp=False, level=LogLevel.INFO):
+        """Write text to the log file, unless level is above the tool's log level"""
+        if level > self.log_level:
+            return
+        text = " ".join(str(s) for s in msg)
+        if add_timestamp:
+            time_now = datetime.datetime.now()
+            text = time_now.strftime(Tool.TIMESTAMP_FORMAT) + text
+        self.log_sink.write(self.log_path, f"{text}\n")
+
+    def info(self, msg, *args):
+        """Log a message at INFO level (see _log_lazy)"""
+        self._log_lazy(LogLevel.INFO, msg, args)
+
+    def debug(self, msg, *args):
+        """Log a message at DEBUG level (see _log_lazy)"""
+        self._log_lazy(LogLevel.DEBUG, msg, args)
+
+    def trace(self, msg, *args):
+        """Log a message at TRACE level (see _log_lazy)"""
+        self._log_lazy(LogLevel.TRACE, msg, args)
+
+    def _log_lazy(self, level, msg, args):
+        """Log msg % args, or the result of calling msg if it is callable.  The message is
+        only formatted if level is enabled, eg. self.trace(lambda: ",".join(names))"""
+        if level > self.log_level:
+            return
+        if callable(msg):
+            msg = msg()
+        elif args:
+            msg = msg % args
+        self.log(msg, level=level)
+
+    def log_enabled(self, level):
+        """Check before building expensive log messages"""
+        return level <= self.log_level
+
+    def log_captured_output(self, text):
+        """Log output the tool wrote to stdout/stderr while it ran (see output_cntrl)"""
+        self.log_title("Captured stdout/stderr")
+        self.log_sink.write(self.log_path, text)
+
+    def flush_log(self):
+        self.log_sink.flush()
+
+    def close_log(self):
+        self.log_sink.close()
+
+    @metrics.phase(metrics.UP_TO_DATE_CHECK)
+    def need_to_rerun(self, tool_products, dependencies):
+        """Determines whether previous run data can be reused or if the tool needs to be rerun.
+        dependencies are the input files of the tool.  Products are only out of date if their
+        fingerprint (see fingerprint()) has changed, not just because a file was touched."""
+        # Product logs are read, and may be removed or replaced
+        self.close_log()
+
+        self.tool_products.extend(tool_products)
+        fingerprint = self.fingerprint(tool_products, dependencies)
 
         # Loop through tool prodcuts
         for tool_product in tool_products:
@@ -116,12 +186,12 @@ class Tool(abc.ABC):
             if tool_product.log_path:
                 # If log file is missing, re-run
                 if not tool_product.log_path.is_file():
-                    return True
+                    return self.rerun_with(tool_products, fingerprint)
 
                 # If log file is out of date, need to re-run
-                if dependency_modified_time > tool_product.log_path.stat().st_mtime:
+                if not self.fingerprint_matches(tool_product, fingerprint, dependencies):
                     self.log_path.unlink()
-                    return True
+                    return self.rerun_with(tool_products, fingerprint)
 
                 # If log file has an error, raise an exception
                 status = tool_product.check_log_fcn(tool_product.log_path)
@@ -131,21 +201,121 @@ class Tool(abc.ABC):
                 # If log file doesn't have an error, but output file is expected and missing, re-run
                 if (tool_product.file_path is not None) and (not tool_product.file_path.is_file()):
                     self.log_path.unlink()
-                    return True
+                    return self.rerun_with(tool_products, fingerprint)
             else:
                 # This ToolProduct doesn't produce a log file
 
                 # Rerun if product file is missing, or if product file is out of date
-                if not tool_product.file_path.is_file() or (
-                    dependency_modified_time > tool_product.file_path.stat().st_mtime
+                if not tool_product.file_path.is_file() or not self.fingerprint_matches(
+                    tool_product, fingerprint, dependencies
                 ):
-                    return True
+                    return self.rerun_with(tool_products, fingerprint)
 
         # Tool does not need to be rerun
         return False
 
-    def exec_and_log(self, cmd, cwd=None, fp=None, fp_err=None, env=None, timeout=None):
-        """Run a command using Popen and log the output, return the process handle"""
+    def fingerprint(self, tool_products, dependencies):
+        """Fingerprint of everything that determines the tool's products: the contents of the
+        input files, the tool arguments, the source of the tool classes, and the part.  Returns
+        the input file stamps (so unchanged inputs are not rehashed next time) and the digest."""
+        previous = {}
+        for tool_product in tool_products:
+            previous.update(read_fingerprint(tool_product).get("inputs", {}))
+
+        inputs = {}
+        for path in dependencies:
+            try:
+                inputs[str(path)] = file_stamp(path, previous.get(str(path)))
+            except OSError as e:
+                raise BfasstException(f"Cannot read input file {path}: {e.strerror}") from e
+        # Paths are left out, so that the digest is the same in every build directory
+        contents = {
+            "inputs": [stamp["sha256"] for stamp in inputs.values()],
+            "args": vars(self.args) if self.args is not None else None,
+            "source": sorted(file_stamp(path)["sha256"] for path in self.source_files()),
+            "part": config.PART,
+        }
+        digest = hashlib.sha256(json.dumps(contents, sort_keys=True, default=str).encode())
+        return {"digest": digest.hexdigest(), "inputs": inputs}
+
+    def source_files(self):
+        """Source files of the tool classes"""
+        return {
+            pathlib.Path(sys.modules[cls.__module__].__file__)
+            for cls in type(self).__mro__
+            if cls.__module__.startswith("bfasst.")
+        }
+
+    def fingerprint_matches(self, tool_product, fingerprint, dependencies):
+        """Check the fingerprint saved beside a product.  Products from before fingerprints
+        were saved are checked by modification time (of the inputs and the tool source)
+        instead, and adopted if up to date."""
+        saved = read_fingerprint(tool_product)
+        if saved:
+            return saved["digest"] == fingerprint["digest"]
+
+        product_path = tool_product.file_path or tool_product.log_path
+        if not product_path.is_file() or any(
+            path.stat().st_mtime > product_path.stat().st_mtime
+            for path in itertools.chain(dependencies, self.source_files())
+        ):
+            return False
+        write_fingerprint(tool_product, fingerprint)
+        return True
+
+    def rerun_with(self, tool_products, fingerprint):
+        """Restore the products from the artifact cache if they are there, and return False.
+        Otherwise, invalidate the saved fingerprints of the products until save_fingerprints()
+        is called after the tool succeeds, so a failed run is never mistaken for an up to date
+        one, and return True."""
+        cache = get_artifact_cache()
+        paths = product_files(tool_products)
+        key = ArtifactCache.key(type(self).__name__, fingerprint["digest"], paths)
+        log_paths = {tool_product.log_path for tool_product in tool_products}
+        if cache is not None and cache.restore(key, paths, copy_paths=log_paths):
+            self.log("Products restored from artifact cache")
+            for tool_product in tool_products:
+                write_fingerprint(tool_product, fingerprint)
+            return False
+
+        for path in paths:
+            # Products restored from the cache are hardlinks, which the tool must not overwrite
+            if path.is_file() and path.stat().st_nlink > 1:
+                path.unlink()
+        for tool_product in tool_products:
+            write_fingerprint(tool_product, {"digest": None, "inputs": fingerprint["inputs"]})
+        self.new_fingerprints.append((tool_products, fingerprint, key))
+        return True
+
+    @metrics.phase(metrics.PRODUCT_WRITE)
+    def save_fingerprints(self):
+        """Save the fingerprint of a successful run beside each of its products, and add the
+        products to the artifact cache"""
+        cache = get_artifact_cache()
+        for tool_products, fingerprint, key in self.new_fingerprints:
+            for tool_product in tool_products:
+                if (tool_product.file_path or tool_product.log_path).is_file():
+                    write_fingerprint(tool_product, fingerprint)
+
+            paths = product_files(tool_products)
+            if cache is not None and all(path.is_file() for path in paths):
+                cache.store(key, paths)
+        self.new_fingerprints = []
+
+    def product_paths(self):
+        """Paths of all existing product (and product log) files of this tool"""
+        return [path for path in product_files(self.tool_products) if path.is_file()]
+
+    def exec_and_log(
+        self, cmd, cwd=None, fp=None, fp_err=None, *, env=None, timeout=None, tail=None
+    ):
+        """Run a command using Popen and log the output, return the process handle.
+
+        stdout is written to fp, or the tool log if fp is None.  stderr is written to fp_err,
+        or merged into stdout if fp_err is None.  Output is copied in chunks as it arrives,
+        and tail(text) is called with each chunk, eg. to watch a long run.  If the command
+        runs for more than timeout seconds, it is killed and subprocess.TimeoutExpired is
+        raised."""
 
         # Default cwd is the work directory
         if cwd is None:
@@ -154,39 +324,124 @@ class Tool(abc.ABC):
         # Can't provide an fp_err without an fp
         assert fp_err is None or fp is not None
 
-        enable_proxy()
-        buf = redirect()
-        proc = subprocess.Popen(
-            cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT if fp_err is None else subprocess.PIPE,
-            universal_newlines=True,
-            cwd=cwd,
-            env=env,
+        with metrics.phase(metrics.SUBPROCESS) as phase_record:
+            phase_record["cmd"] = str(cmd[0]) if isinstance(cmd, list) else str(cmd)
+            proc = subprocess.Popen(
+                cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT if fp_err is None else subprocess.PIPE,
+                cwd=cwd,
+                env=env,
+            )
+
+            def write_log(text):
+                self.log_sink.write(self.log_path, text)
+
+            outputs = [(proc.stdout, fp.write if fp else write_log)]
+            if fp_err:
+                outputs.append((proc.stderr, fp_err.write))
+
+            remaining = self._time_remaining(proc, timeout)
+            try:
+                self._stream_output(outputs, remaining, tail)
+                phase_record["child_peak_rss_kb"] = self._wait_for_exit(proc, remaining)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+                self.log(f"\nKilled after running for more than {timeout} seconds")
+                raise
+            finally:
+                for pipe, _ in outputs:
+                    pipe.close()
+                # Callers usually check the log for errors next
+                self.flush_log()
+        return proc
+
+    def _stream_output(self, outputs, remaining, tail):
+        """Copy the output of a process from each pipe to its write function, as it arrives,
+        until the pipes are closed.  Pipes are read together, so neither can fill up and block
+        the process."""
+        with selectors.DefaultSelector() as selector:
+            for pipe, write in outputs:
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                selector.register(pipe, selectors.EVENT_READ, (write, decoder))
+
+            while selector.get_map():
+                for key, _ in selector.select(remaining()):
+                    write, decoder = key.data
+                    chunk = os.read(key.fd, self.EXEC_CHUNK_SIZE)
+                    if not chunk:
+                        selector.unregister(key.fileobj)
+                    text = decoder.decode(chunk, final=not chunk)
+                    if not text:
+                        continue
+                    write(text)
+                    if tail:
+                        tail(text)
+
+    @staticmethod
+    def _wait_for_exit(proc, remaining):
+        """Wait for proc to exit, and return its peak RSS (in KiB).  The process is reaped
+        with wait4() rather than proc.wait(), as that is the only way to get its own resource
+        usage, rather than that of all children of this (long-lived worker) process."""
+        delay = 0.001
+        while True:
+            pid, status, usage = os.wait4(proc.pid, os.WNOHANG)
+            if pid:
+                break
+            # The process has usually closed its output because it is exiting, so poll
+            # quickly at first
+            delay = min(delay * 2, 0.1)
+            time.sleep(min(delay, remaining() or delay))
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return usage.ru_maxrss
+
+    @staticmethod
+    def _time_remaining(proc, timeout):
+        """Return a function giving the time left (or None) before proc times out, which
+        raises subprocess.TimeoutExpired once the time is up"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining():
+            if deadline is None:
+                return None
+            time_left = deadline - time.monotonic()
+            if time_left <= 0:
+                raise subprocess.TimeoutExpired(proc.args, timeout)
+            return time_left
+
+        return remaining
+
+
+def product_files(tool_products):
+    """Paths of the product (and product log) files of the tool products"""
+    paths = []
+    for tool_product in tool_products:
+        paths.extend(
+            path
+            for path in (tool_product.file_path, tool_product.log_path)
+            if path is not None and path not in paths
         )
+    return paths
 
-        with open(self.log_path, "a") as f:
-            buf.seek(0)
-            copyfileobj(buf, f)
-        cleanup_redirect()
 
-        # Print stdout to log
-        for line in proc.stdout:
-            if fp:
-                fp.write(line)
-            else:
-                self.log(line.strip())
+def fingerprint_path(tool_product):
+    """The fingerprint of a product is saved beside its file (or its log, if it has no file)"""
+    path = tool_product.file_path or tool_product.log_path
+    return path.with_name(path.name + ".fingerprint")
 
-        # If stderr is separate, print it to log as well.
-        if fp_err:
-            for line in proc.stderr:
-                if fp:
-                    fp.write(line)
-                else:
-                    self.log(line.strip())
 
-        proc.communicate(timeout=timeout)
-        return proc
+def read_fingerprint(tool_product):
+    try:
+        with open(fingerprint_path(tool_product)) as fp:
+            return json.load(fp)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_fingerprint(tool_product, fingerprint):
+    with open(fingerprint_path(tool_product), "w") as fp:
+        json.dump(fingerprint, fp)
 
 
 class ToolArgParser(argparse.ArgumentParser):
@@ -3,6 +3,7 @@ from enum import Enum
 import spydrnet as sdn
 from bfasst.transform.base import TransformTool, TransformException
 from bfasst.rw_helpers import get_sdn_direction_for_unisim, get_unisim_inputs
+from bfasst.types import Resource
 from bfasst.utils import convert_verilog_literal_to_int
 
 
@@ -17,6 +18,7 @@ class ErrorInjector(TransformTool):
     """Tool to inject errors into a netlist"""
 
     TOOL_WORK_DIR = "error_injection"
+    RESOURCES = {Resource.JVM: 1, Resource.MEMORY_GB: 2}
 
     def __init__(self, cwd, design, log_num, random_generator) -> None:
         super().__init__(cwd, design)
@@ -1,16 +1,18 @@
 """ Creates a xilinx netlist that has only physical primitives"""
 
-import pathlib
+import functools
 import re
 
 import jpype
 import jpype.imports
 from jpype.types import JInt
 
-from bfasst import jpype_jvm
+from bfasst import jpype_jvm, metrics
 from bfasst.config import VIVADO_BIN_PATH
+from bfasst.log_sink import LogLevel
 from bfasst.tool import ToolProduct
 from bfasst.transform.base import TransformTool, TransformException
+from bfasst.types import Resource
 from bfasst.utils import TermColor
 import bfasst.rw_helpers as rw
 
@@ -30,6 +32,7 @@ class XilinxPhysNetlist(TransformTool):
     """Creates a xilinx netlist that has only physical primitives"""
 
     TOOL_WORK_DIR = "xilinx_phys_netlist"
+    RESOURCES = {Resource.JVM: 1, Resource.MEMORY_GB: 8}
 
     def __init__(self, work_dir, design):
         super().__init__(work_dir, design)
@@ -64,12 +67,12 @@ class XilinxPhysNetlist(TransformTool):
         if not self.need_to_rerun(
             tool_products=[
                 ToolProduct(phys_netlist_verilog_path),
+                ToolProduct(phys_netlist_edif_path),
+            ],
+            dependencies=[
+                self.design.xilinx_impl_checkpoint_path,
+                self.design.impl_edif_path,
             ],
-            dependency_modified_time=max(
-                pathlib.Path(__file__).stat().st_mtime,
-                self.design.xilinx_impl_checkpoint_path.stat().st_mtime,
-                self.design.impl_edif_path.stat().st_mtime,
-            ),
         ):
             self.log("Physical netlist conversion already run")
             return
@@ -126,14 +129,16 @@ class XilinxPhysNetlist(TransformTool):
 
         return edif_net
 
+    @metrics.phase("run_rapidwright")
     def run_rapidwright(self, phys_netlist_checkpoint, phys_netlist_edif_path):
         """Do all rapidwright related processing on the netlist"""
 
         # Read the checkpoint into rapidwright, and get the netlist
-        self.rw_design = Design.readCheckpoint(
-            self.design.xilinx_impl_checkpoint_path, self.design.impl_edif_path
-        )
-        self.rw_netlist = self.rw_design.getNetlist()
+        with metrics.phase("read_checkpoint"):
+            self.rw_design = Design.readCheckpoint(
+                self.design.xilinx_impl_checkpoint_path, self.design.impl_edif_path
+            )
+            self.rw_netlist = self.rw_design.getNetlist()
 
         # Init BUFGCTRL cell template
         self.bufgctrl_edif_cell = self.rw_netlist.getHDIPrimitive(Unisim.BUFGCTRL)
@@ -159,59 +164,75 @@ class XilinxPhysNetlist(TransformTool):
         # over Design.getCells() as it does not return LUT routethru objects.
         self.process_all_luts(cells_already_visited)
 
-        # Loop through all cells in the design
-        for cell in self.rw_design.getCells():
-            edif_cell_inst = cell.getEDIFCellInst()
+        with metrics.phase("process_cells"):
+            # Loop through all cells in the design
+            for cell in self.rw_design.getCells():
+                edif_cell_inst = cell.getEDIFCellInst()
 
-            self.log(
-                cell.getName(),
-                f"({edif_cell_inst.getCellType().getName() if edif_cell_inst else 'None'})",
-            )
+                if self.log_enabled(LogLevel.TRACE):
+                    self.trace(
+                        "%s (%s)",
+                        cell.getName(),
+                        edif_cell_inst.getCellType().getName() if edif_cell_inst else "None",
+                    )
 
-            if edif_cell_inst is None:
-                self.log("  Skipping")
-                continue
+                if edif_cell_inst is None:
+                    self.trace("  Skipping")
+                    continue
 
-            if cell in cells_already_visited:
-                continue
+                if cell in cells_already_visited:
+                    continue
 
-            cell_type = edif_cell_inst.getCellType().getName()
-            if cell_type in ("MUXF7", "MUXF8"):
-                cells_to_remove.extend(self.process_muxf7_muxf8(cell))
-                continue
+                cell_type = edif_cell_inst.getCellType().getName()
+                if cell_type in ("MUXF7", "MUXF8"):
+                    cells_to_remove.extend(self.process_muxf7_muxf8(cell))
+                    continue
 
-            if cell_type in ("CARRY4",):
-                cells_to_remove.extend(self.process_carry4(cell))
-                continue
+                if cell_type in ("CARRY4",):
+                    cells_to_remove.extend(self.process_carry4(cell))
+                    continue
 
-            if cell_type in ("BUFG",):
-                cells_to_remove.extend(self.process_bufg(cell))
-                continue
+                if cell_type in ("BUFG",):
+                    cells_to_remove.extend(self.process_bufg(cell))
+                    continue
 
-            # These primitives don't need to get transformed
-            if cell_type in ("IBUF", "OBUF", "OBUFT", "FDSE", "FDRE", "FDCE", "RAMB36E1", "FDPE"):
-                continue
+                # These primitives don't need to get transformed
+                if cell_type in (
+                    "IBUF",
+                    "OBUF",
+                    "OBUFT",
+                    "FDSE",
+                    "FDRE",
+                    "FDCE",
+                    "RAMB36E1",
+                    "FDPE",
+                ):
+                    continue
 
-            # TODO: Handle other primitives? SRL, FIFO36, DSP48E1, etc.
-            print(cell)
-            raise TransformException(f"Unsupported cell type {cell_type}")
+                # TODO: Handle other primitives? SRL, FIFO36, DSP48E1, etc.
+                print(cell)
+                raise TransformException(f"Unsupported cell type {cell_type}")
 
         # Remove old unusued cells
-        self.log("Removing old cells...")
-        for cell in cells_to_remove:
-            self.log("  ", cell.getName())
-            edif_cell_inst = cell.getEDIFCellInst()
+        self.debug("Removing old cells...")
+        with metrics.phase("remove_cells"):
+            for cell in cells_to_remove:
+                self.trace("   %s", cell.getName())
+                edif_cell_inst = cell.getEDIFCellInst()
 
-            # Remove the port instances
-            edif_cell_inst.getParentCell().removeCellInst(edif_cell_inst)
+                # Remove the port instances
+                edif_cell_inst.getParentCell().removeCellInst(edif_cell_inst)
 
         # Export checkpoint, then run vivado to generate a new netlist
-        self.rw_design.unplaceDesign()
-        self.rw_design.writeCheckpoint(phys_netlist_checkpoint)
+        with metrics.phase("write_checkpoint"):
+            self.rw_design.unplaceDesign()
+            self.rw_design.writeCheckpoint(phys_netlist_checkpoint)
 
         self.log("\nWriting EDIF phsyical netlist:", phys_netlist_edif_path)
-        self.rw_netlist.exportEDIF(phys_netlist_edif_path)
+        with metrics.phase("export_edif"):
+            self.rw_netlist.exportEDIF(phys_netlist_edif_path)
 
+    @metrics.phase("process_luts")
     def process_all_luts(self, cells_already_visited):
         """Visit all LUTs and replace them with LUT6_2 instances"""
 
@@ -307,6 +328,7 @@ class XilinxPhysNetlist(TransformTool):
 
         self.log("Exported new netlist to", phys_netlist_verilog_path)
 
+    @metrics.phase(metrics.LOG_PARSE)
     def check_vivado_output(self, vivado_log_path):
         """Check the log output of the Vivado exeuction for ERROR messages"""
         txt = open(vivado_log_path).read()
@@ -352,7 +374,7 @@ class XilinxPhysNetlist(TransformTool):
         parent, edif_cells = self.lutram_assertions(cells)
         new_cell_name = rw.generate_combinded_cell_name(edif_cells)
         cell_str = f"2 LUT_RAMS ({' '.join([str(n.getName()) for n in cells])})"
-        self.log(f"\nConverting {cell_str} to RAM32X1D {new_cell_name}")
+        self.debug("\nConverting %s to RAM32X1D %s", cell_str, new_cell_name)
 
         ram32x1d = parent.createChildCellInst(new_cell_name, self.ram32x1d_edif_cell)
 
@@ -380,7 +402,7 @@ class XilinxPhysNetlist(TransformTool):
         parent, edif_cells = self.lutram_assertions(cells)
         new_cell_name = rw.generate_combinded_cell_name(edif_cells)
         cell_str = f"4 LUT_RAMS ({' '.join([str(n.getName()) for n in cells])})"
-        self.log(f"\nConverting {cell_str} to RAM32M {new_cell_name}")
+        self.debug("\nConverting %s to RAM32M %s", cell_str, new_cell_name)
 
         ram32m = parent.createChildCellInst(new_cell_name, self.ram32m_edif_cell)
 
@@ -454,9 +476,9 @@ class XilinxPhysNetlist(TransformTool):
         they are permuted in some way."""
 
         type_name = cell.getEDIFCellInst().getCellType().getName()
-        self.log(f"\nProcessing {type_name}", cell)
+        self.debug("\nProcessing %s %s", type_name, cell)
         if rw.PinMapping.cell_is_default_mapping(cell):
-            self.log("  Inputs not permuted, skipping")
+            self.trace("  Inputs not permuted, skipping")
             return []
 
         raise NotImplementedError
@@ -467,10 +489,10 @@ class XilinxPhysNetlist(TransformTool):
         assume they can't be and throw a NotImplementedError exception if
         they are permuted in some way."""
         type_name = cell.getEDIFCellInst().getCellType().getName()
-        self.log(f"\nProcessing {type_name}", cell)
+        self.debug("\nProcessing %s %s", type_name, cell)
 
         if rw.PinMapping.cell_is_default_mapping(cell):
-            self.log("  Inputs not permuted, skipping")
+            self.trace("  Inputs not permuted, skipping")
             return []
 
         raise NotImplementedError
@@ -481,7 +503,7 @@ class XilinxPhysNetlist(TransformTool):
         assert bufg_edif_inst
 
         type_name = bufg_edif_inst.getCellType().getName()
-        self.log(f"\nProcessing {type_name}", bufg_cell)
+        self.debug("\nProcessing %s %s", type_name, bufg_cell)
 
         assert rw.PinMapping.cell_is_default_mapping(bufg_cell)
 
@@ -490,7 +512,7 @@ class XilinxPhysNetlist(TransformTool):
             new_cell_name, self.bufgctrl_edif_cell
         )
 
-        self.log("Created new cell", new_cell_name)
+        self.debug("Created new cell %s", new_cell_name)
 
         bufgctrl.setPropertiesMap(bufg_edif_inst.createDuplicatePropertiesMap())
 
@@ -505,7 +527,7 @@ class XilinxPhysNetlist(TransformTool):
         bufgctrl.addProperty("PRESELECT_I1", "FALSE")
 
         # Copy pins
-        self.log(f"  Copying pins from {bufg_cell.getName()}")
+        self.trace("  Copying pins from %s", bufg_cell.getName())
 
         for pins in bufg_cell.getPinMappingsL2P().items():
             rw.valid_net_transfer(*pins, bufg_edif_inst, bufgctrl)
@@ -522,10 +544,12 @@ class XilinxPhysNetlist(TransformTool):
         """Process a LUT that isn't part of the design (ie no cell), but
         is configured to generate a GND signal"""
 
-        self.log(
+        self.debug(
+            "\n%sProcessing LUT GND at site %s, pin(s):%s %s",
             TermColor.BLUE,
-            f"\nProcessing LUT GND at site {site_inst}, pin(s):",
-            ",".join(str(p) for p in pins),
+            site_inst,
+            TermColor.END,
+            ",".join(pins),
         )
 
         # Create a new lut6_2 instance
@@ -536,19 +560,19 @@ class XilinxPhysNetlist(TransformTool):
         new_cell_inst.setPropertiesMap(
             {"INIT": EDIFPropertyValue("64'h0000000000000000", EDIFValueType.STRING)}
         )
-        self.log("Created new cell", new_cell_name)
+        self.debug("Created new cell %s", new_cell_name)
 
         for pin_out in pins:
-            self.log("Processing GND output pin", pin_out)
+            self.trace("Processing GND output pin %s", pin_out)
 
             # Create a new net to replace the global ground
             new_net_name = str(site_inst.getName()) + "." + pin_out + ".GND"
-            self.log("  Creating new GND net", new_net_name)
+            self.trace("  Creating new GND net %s", new_net_name)
             new_net = EDIFNet(new_net_name, self.rw_design.getTopEDIFCell())
 
             # Drive net using LUT output port
             lut_out_port = new_cell_inst.getPort("O6" if pin_out.endswith("O6") else "O5")
-            self.log("  Connecting new net to LUT output port", lut_out_port.getName())
+            self.trace("  Connecting new net to LUT output port %s", lut_out_port.getName())
             assert lut_out_port
             new_net.createPortInst(lut_out_port, new_cell_inst)
 
@@ -556,7 +580,7 @@ class XilinxPhysNetlist(TransformTool):
             for pin_in in site_inst.getSiteWirePins(pin_out):
                 cell = site_inst.getCell(pin_in.getBEL())
                 if cell:
-                    self.log(" ", pin_in, pin_in.getBEL(), site_inst.getCell(pin_in.getBEL()))
+                    self.trace("  %s %s %s", pin_in, pin_in.getBEL(), cell)
                     routed_to_cell_inst = cell.getEDIFCellInst()
 
                     # Map physical pin back to logical netlist port name
@@ -596,8 +620,8 @@ class XilinxPhysNetlist(TransformTool):
         with logical mapping equal to the physical mapping."""
 
         assert lut6_cell is not None
-        self.log(
-            "\nProcessing and replacing LUT(s):",
+        self.debug(
+            "\nProcessing and replacing LUT(s): %s",
             ",".join(
                 str(lut_cell) + ("(routethru)" if lut_cell.isRoutethru() else "")
                 for lut_cell in (lut6_cell, lut5_cell)
@@ -624,7 +648,7 @@ class XilinxPhysNetlist(TransformTool):
         new_cell_inst = lut6_edif_cell_inst.getParentCell().createChildCellInst(
             new_cell_name, self.lut6_2_edif_cell
         )
-        self.log("Created new cell", new_cell_name)
+        self.debug("Created new cell %s", new_cell_name)
 
         ##### Copy all properties from existing LUT to new LUT (INIT will be fixed later)
         new_cell_inst.setPropertiesMap(lut6_edif_cell_inst.createDuplicatePropertiesMap())
@@ -633,7 +657,7 @@ class XilinxPhysNetlist(TransformTool):
         #### Wire up inputs/outputs
         physical_pins_to_nets = {}
 
-        self.log(f"Processing LUT {lut6_cell.getName()}")
+        self.trace("Processing LUT %s", lut6_cell.getName())
         for logical_pin, physical_pin in lut6_cell.getPinMappingsL2P().items():
             assert len(physical_pin) == 1
             physical_pin = list(physical_pin)[0]
@@ -648,7 +672,7 @@ class XilinxPhysNetlist(TransformTool):
 
         # Now do the same for the other LUT
         if lut5_cell:
-            self.log(f"Processing LUT {lut5_cell.getName()}")
+            self.trace("Processing LUT %s", lut5_cell.getName())
             for logical_pin, physical_pin in lut5_cell.getPinMappingsL2P().items():
                 assert len(physical_pin) == 1
                 physical_pin = list(physical_pin)[0]
@@ -686,7 +710,9 @@ class XilinxPhysNetlist(TransformTool):
             self.create_lut_routethru_net(lut5_cell, True, new_cell_inst)
 
         # Fix the new LUT INIT property based on the new pin mappings
-        rw.process_lut_init(lut6_cell, lut5_cell, new_cell_inst, self.log)
+        rw.process_lut_init(
+            lut6_cell, lut5_cell, new_cell_inst, functools.partial(self.log, level=LogLevel.TRACE)
+        )
 
         # Return the cells to be removed
         cells_to_remove = []
@@ -700,7 +726,7 @@ class XilinxPhysNetlist(TransformTool):
         """Extra processing for LUT route through.  Need to create a new net
         connecting from the new LUT6_2 instance to the FF"""
 
-        self.log("Creating routethru for", cell.getName())
+        self.trace("Creating routethru for %s", cell.getName())
 
         # Create the new net
         new_net_name = (
@@ -709,14 +735,14 @@ class XilinxPhysNetlist(TransformTool):
             + str(cell.getBEL().getName())[0]
             + ("6" if not is_lut5 else "5")
         )
-        self.log("  Creating new net", new_net_name)
+        self.trace("  Creating new net %s", new_net_name)
         new_net = EDIFNet(new_net_name, cell.getEDIFCellInst().getParentCell())
 
         # Connect net to LUT output
         lut_out_port = new_lut_cell.getPort("O5" if is_lut5 else "O6")
         assert lut_out_port
-        self.log(
-            "  Connecting new net to LUT", new_lut_cell.getName(), "port", lut_out_port.getName()
+        self.trace(
+            "  Connecting new net to LUT %s port %s", new_lut_cell.getName(), lut_out_port.getName()
         )
         new_net.createPortInst(lut_out_port, new_lut_cell)
 
@@ -741,10 +767,9 @@ class XilinxPhysNetlist(TransformTool):
         routed_to_port_inst = routed_to_cell_inst.getPortInst(routed_to_port_name)
         assert routed_to_port_inst
 
-        self.log(
-            "  Connecting new net to BEL",
+        self.trace(
+            "  Connecting new net to BEL %s, port %s",
             routed_to_cell.getBEL().getName(),
-            ", port",
             routed_to_port_name,
         )
 
@@ -768,7 +793,7 @@ class XilinxPhysNetlist(TransformTool):
         and disconnects from the old cell.  It's possible the net is already_connected to the
         new cell, in which case only the disconnect from old cell needs to be performed."""
 
-        self.log(f"  Processing logical pin {old_logical_pin}, physical pin {physical_pin}")
+        self.trace("  Processing logical pin %s, physical pin %s", old_logical_pin, physical_pin)
 
         port_inst = old_edif_cell_inst.getPortInst(old_logical_pin)
         logical_net = port_inst.getNet()
@@ -776,32 +801,30 @@ class XilinxPhysNetlist(TransformTool):
 
         if already_connected_net:
             assert logical_net == already_connected_net
-            self.log(f"    Skipping already connected physical pin {physical_pin}")
+            self.trace("    Skipping already connected physical pin %s", physical_pin)
 
         else:
             if port_inst.getDirection() == EDIFDirection.INPUT:
-                self.log("    Input driven by net", logical_net)
+                self.trace("    Input driven by net %s", logical_net)
 
                 # A5 becomes I4, A1 becomes I0, etc.
                 new_logical_pin = f"I{int(str(physical_pin[1])) - 1}"
-                self.log(
-                    "    Connecting net",
+                self.trace(
+                    "    Connecting net %s to input pin %s on new cell",
                     logical_net,
-                    "to input pin",
                     new_logical_pin,
-                    "on new cell",
                 )
 
             elif port_inst.getDirection() == EDIFDirection.OUTPUT:
-                self.log("    Drives net", logical_net)
+                self.trace("    Drives net %s", logical_net)
 
                 new_logical_pin = physical_pin
-                self.log("    Connecting net", logical_net, "to output pin", new_logical_pin)
+                self.trace("    Connecting net %s to output pin %s", logical_net, new_logical_pin)
 
             new_port = new_edif_cell_inst.getPort(new_logical_pin)
             assert new_port
             logical_net.createPortInst(new_port, new_edif_cell_inst)
 
         # Disconnect connection to port on old cell
-        self.log("    Disconnecting net", logical_net, "from pin", old_logical_pin, "on old cell")
+        self.trace("    Disconnecting net %s from pin %s on old cell", logical_net, old_logical_pin)
         logical_net.removePortInst(port_inst)
@@ -14,6 +14,15 @@ class ToolType(Enum):
     REVERSE = 5
 
 
+class Resource(Enum):
+    """Resources that are limited across all jobs of an experiment"""
+
+    CONFORMAL_LICENSE = auto()
+    ONESPIN_LICENSE = auto()
+    MEMORY_GB = auto()  # Estimated peak memory usage
+    JVM = auto()  # Jobs that start a JVM to run RapidWright
+
+
 class Vendor(Enum):
     """Enum differentiating between different fpga vendors"""
 
@@ -125,3 +125,29 @@ def properties_are_equal(prop1, prop2):
     True
     """
     return convert_verilog_literal_to_int(prop1) == convert_verilog_literal_to_int(prop2)
+
+
+def properties_key(properties, names, defaults=None):
+    """Values of the named properties, as integers (see convert_verilog_literal_to_int), to
+    index instances by, so that instances with equal properties have equal keys.  Properties
+    left out (eg. of a netlist that omits default values) take their value from defaults.
+    Returns None if a property is missing and has no default.
+
+    >>> properties_key({"INIT": "4'h9", "WIDTH": "8"}, ("INIT",))
+    (9,)
+    >>> properties_key({"INIT_00": "256'h0"}, ("INIT_00", "INIT_01")) is None
+    True
+    >>> defaults = {"INIT_00": "256'h0", "INIT_01": "256'h0"}
+    >>> properties_key({"INIT_00": "256'h1"}, ("INIT_00", "INIT_01"), defaults)
+    (1, 0)
+    >>> properties_key({"INIT_00": "256'h1", "INIT_01": "256'h0"}, ("INIT_00", "INIT_01"))
+    (1, 0)
+    """
+    defaults = defaults or {}
+    values = []
+    for name in names:
+        value = properties.get(name, defaults.get(name))
+        if value is None:
+            return None
+        values.append(convert_verilog_literal_to_int(value))
+    return tuple(values)
@@ -0,0 +1,413 @@
+""" Pool of long-lived worker processes used to run experiment jobs """
+
+from collections import deque
+from concurrent.futures import Future
+import importlib
+import multiprocessing
+from multiprocessing.connection import AuthenticationError, Client, Listener
+import os
+import queue
+import signal
+import threading
+import traceback
+
+from bfasst import output_cntrl
+from bfasst.tool import BfasstException
+from bfasst.utils import TermColor, print_color
+
+AUTHKEY_ENV = "BFASST_WORKER_AUTHKEY"
+
+# Sent to a worker to kill it, and any processes it started, while it runs a task
+KILL = "kill"
+
+# Modules imported by warm workers when they start, so that jobs routed to them
+# don't pay for starting the JVM and loading the RapidWright classes.
+WARM_MODULES = (
+    "bfasst.rw_helpers",
+    "bfasst.compare.structural",
+    "bfasst.transform.error_injector",
+    "bfasst.transform.xilinx_phys_netlist",
+)
+
+# Warm up failures (across the pool) after which failed warm workers are replaced by cold
+# workers, rather than trying to warm up again
+MAX_WARM_UP_FAILURES = 3
+
+
+class WorkerDiedException(BfasstException):
+    """Raised for a task whose worker process exited before returning a result"""
+
+
+class WarmUpException(BfasstException):
+    """Sent by a warm worker that failed to warm up, with the traceback, before it exits"""
+
+
+def warm_up():
+    """Start the JVM and load RapidWright in this process"""
+    # pylint: disable=import-outside-toplevel
+    from bfasst import jpype_jvm
+
+    jpype_jvm.start()
+    for module in WARM_MODULES:
+        importlib.import_module(module)
+
+
+def receive_tasks(conn, tasks):
+    """Receive tasks into a queue, so that KILL is handled even while a task is running"""
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            task = None
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Task couldn't be unpickled (eg. missing module), fail it rather than the worker
+            task = BfasstException(f"Could not receive task: {type(e).__name__}: {e}")
+        if task == KILL:
+            os.killpg(0, signal.SIGKILL)
+        tasks.put(task)
+        if task is None:
+            return
+
+
+def worker_main(conn, warm):
+    """Main loop of a worker process.  Receives (function, args) tasks until
+    it receives None, and sends back (success, result or exception)."""
+    # Run in a process group of our own, so that a task that runs too long can be
+    # killed along with any tools it started
+    os.setpgid(0, 0)
+
+    # Capture the output of jobs into their logs, rather than the terminal
+    output_cntrl.install()
+
+    tasks = queue.Queue()
+    threading.Thread(target=receive_tasks, args=(conn, tasks), daemon=True).start()
+
+    if warm:
+        try:
+            warm_up()
+        except Exception:  # pylint: disable=broad-exception-caught
+            conn.send(WarmUpException(f"Worker failed to warm up:\n{traceback.format_exc()}"))
+            return
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        if isinstance(task, BfasstException):
+            conn.send((False, task))
+            continue
+
+        function, args = task
+        try:
+            result = (True, function(*args))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            result = (False, e)
+
+        try:
+            conn.send(result)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            # Result or exception couldn't be pickled (eg. Java exceptions)
+            conn.send((False, BfasstException(f"{type(e).__name__}: {e}")))
+
+
+def get_authkey():
+    """Key that remote workers and the pool authenticate each other with, as tasks are pickled"""
+    if AUTHKEY_ENV not in os.environ:
+        raise BfasstException(f"{AUTHKEY_ENV} must be set to use remote workers")
+    return os.environ[AUTHKEY_ENV].encode()
+
+
+def parse_address(address):
+    """Parse a 'host:port' TCP address, or a Unix socket path, for Listener/Client"""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return (host, int(port))
+    return address
+
+
+def remote_worker_main(address, authkey, warm):
+    """Main function of a worker process that connects to the pool of a coordinator (see
+    WorkerPool.listen()), possibly on another machine, and runs tasks until the pool shuts
+    down"""
+    conn = Client(parse_address(address), authkey=authkey)
+    conn.send(warm)
+    worker_main(conn, warm)
+
+
+class Worker:
+    """A single long-lived worker process, and the task it is currently running"""
+
+    def __init__(self, pool, index, warm):
+        self.pool = pool
+        self.index = index
+        self.warm = warm
+        self.process = None
+        self.conn = None
+        self.future = None
+        # (future, function, args, warm) of the current task, as it was queued
+        self.task = None
+        self.start()
+
+    def start(self):
+        """Spawn the worker process and a thread to collect its results"""
+        self.conn, child_conn = self.pool.mp_context.Pipe()
+        self.process = self.pool.mp_context.Process(
+            target=worker_main, args=(child_conn, self.warm), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        threading.Thread(target=self.collect_results, args=(self.conn,), daemon=True).start()
+
+    @property
+    def idle(self):
+        return self.future is None
+
+    def run(self, future, function, args, warm):
+        self.conn.send((function, args))
+        self.future = future
+        self.task = (future, function, args, warm)
+
+    def exit_description(self):
+        """Wait for the exited worker process, and describe why it exited"""
+        self.process.join()
+        return f"Worker exited with code {self.process.exitcode}"
+
+    def stop(self):
+        """Ask the worker process to exit once its current task is done"""
+        self._send(None)
+
+    def _send(self, message):
+        try:
+            self.conn.send(message)
+        except OSError:
+            # Already disconnected
+            pass
+
+    def kill(self):
+        """Kill the worker process, and any processes it started"""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def join(self):
+        self.process.join()
+
+    def collect_results(self, conn):
+        """Wait for results from the worker process, and pass them to the waiting futures"""
+        while True:
+            try:
+                message = conn.recv()
+            except (EOFError, OSError):
+                self.pool.worker_died(self)
+                return
+            if isinstance(message, WarmUpException):
+                self.pool.warm_up_failed(self, message)
+                return
+
+            success, result = message
+            future = self.pool.task_done(self)
+            if success:
+                future.set_result(result)
+            else:
+                future.set_exception(result)
+
+
+class RemoteWorker(Worker):
+    """A worker process that connected to the pool over a socket, rather than being spawned
+    by it.  Remote workers are not replaced if they exit."""
+
+    def __init__(self, pool, index, warm, conn, address):
+        self.remote_conn = conn
+        self.address = address
+        super().__init__(pool, index, warm)
+
+    def start(self):
+        self.conn = self.remote_conn
+        threading.Thread(target=self.collect_results, args=(self.conn,), daemon=True).start()
+
+    def exit_description(self):
+        return f"Remote worker {self.address} disconnected"
+
+    def kill(self):
+        self._send(KILL)
+
+    def join(self):
+        pass
+
+
+class WorkerPool:
+    """A pool of long-lived, spawned worker processes.
+
+    The first num_warm_workers workers are 'warm': they start the RapidWright JVM and import
+    the RapidWright helpers when they are created, and tasks submitted with warm=True are only
+    routed to these workers.  Other tasks prefer the remaining (cold) workers, but will use
+    an idle warm worker rather than wait.
+
+    Workers on other machines can join the pool once it is listening (see listen() and
+    scripts/run_worker.py).  Tasks are pickled, so remote workers need the same bfasst
+    checkout and build directories, at the same paths (eg. on a shared file system)."""
+
+    def __init__(self, num_workers, num_warm_workers=0):
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.lock = threading.Lock()
+        self.queue = deque()
+        self.shutting_down = False
+        self.workers_changed = threading.Condition(self.lock)
+        self.listener = None
+        self.warm_up_failures = 0
+        self.workers = [
+            Worker(self, index, warm=index < num_warm_workers) for index in range(num_workers)
+        ]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+
+    @property
+    def num_workers(self):
+        return len(self.workers)
+
+    def wait_for_workers(self):
+        """Block until the pool has at least one worker"""
+        with self.workers_changed:
+            self.workers_changed.wait_for(lambda: self.workers)
+
+    def listen(self, address, authkey=None):
+        """Accept remote workers connecting to address ('host:port', or a Unix socket path)"""
+        self.listener = Listener(parse_address(address), authkey=authkey)
+        threading.Thread(target=self._accept_workers, daemon=True).start()
+
+    def _accept_workers(self):
+        """Add workers that connect to the listener to the pool"""
+        while True:
+            try:
+                conn = self.listener.accept()
+                warm = conn.recv()
+            except (OSError, EOFError, AuthenticationError):
+                if self.shutting_down:
+                    return
+                continue
+
+            with self.lock:
+                if self.shutting_down:
+                    conn.close()
+                    return
+                # Unix socket connections have no address of their own
+                address = self.listener.last_accepted or self.listener.address
+                worker = RemoteWorker(self, len(self.workers), warm, conn, address)
+                self.workers.append(worker)
+                self._dispatch()
+                self.workers_changed.notify_all()
+
+    def submit(self, function, *args, warm=False):
+        """Queue function(*args) to run in a worker, and return a Future for its result"""
+        future = Future()
+        with self.lock:
+            self.queue.append((future, function, args, warm))
+            self._dispatch()
+        return future
+
+    def _find_idle_worker(self, warm):
+        idle_workers = [worker for worker in self.workers if worker.idle]
+        if not any(worker.warm for worker in self.workers):
+            # No warm workers, any worker will do (it starts the JVM itself)
+            return next(iter(idle_workers), None)
+        if warm:
+            return next((worker for worker in idle_workers if worker.warm), None)
+        # Prefer cold workers, so that warm workers are free for JVM jobs
+        idle_workers.sort(key=lambda worker: worker.warm)
+        return next(iter(idle_workers), None)
+
+    def _dispatch(self):
+        """Hand queued tasks to idle workers.  Must be called with the lock held."""
+        still_queued = deque()
+        while self.queue:
+            future, function, args, warm = self.queue.popleft()
+            worker = self._find_idle_worker(warm)
+            if worker is None:
+                still_queued.append((future, function, args, warm))
+                continue
+            # Tasks queued again after their worker failed to warm up are already running
+            if not future.running() and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                worker.run(future, function, args, warm)
+            except Exception as e:  # pylint: disable=broad-exception-caught
+                # Task couldn't be sent to the worker (eg. not picklable)
+                future.set_exception(e)
+        self.queue = still_queued
+
+    def task_done(self, worker):
+        """Called when a worker returns a result.  Returns the future for the task."""
+        with self.lock:
+            future = worker.future
+            worker.future = None
+            worker.task = None
+            self._dispatch()
+        return future
+
+    def worker_died(self, worker):
+        """Called when a worker process exits unexpectedly.  Fails its task and replaces it
+        (or removes it from the pool, for remote workers)."""
+        self._replace_worker(worker, WorkerDiedException(worker.exit_description()))
+
+    def warm_up_failed(self, worker, exception):
+        """Called when a warm worker fails to warm up, and exits.  Its task never started, so
+        it is queued again, and the worker is replaced like a worker that died, but with a
+        cold worker once warm up has failed MAX_WARM_UP_FAILURES times (jobs that need the JVM
+        then start it themselves, like any other job run by a cold worker)."""
+        worker.join()
+        print_color(TermColor.RED, f"Worker {worker.index}: {exception}")
+        with self.lock:
+            self.warm_up_failures += 1
+            if self.warm_up_failures >= MAX_WARM_UP_FAILURES:
+                worker.warm = False
+            if worker.future is not None and not self.shutting_down:
+                self.queue.appendleft(worker.task)
+                worker.future = None
+        self._replace_worker(worker, exception)
+
+    def _replace_worker(self, worker, exception):
+        """Fail the task of an exited worker with exception, and replace the worker"""
+        with self.lock:
+            future = worker.future
+            worker.future = None
+            worker.task = None
+            if isinstance(worker, RemoteWorker):
+                self.workers.remove(worker)
+                self.workers_changed.notify_all()
+            elif not self.shutting_down:
+                worker.start()
+            self._dispatch()
+        if future is not None:
+            future.set_exception(exception)
+
+    def kill(self, future):
+        """Kill the worker running the task of future (and any processes it started).  The
+        worker is replaced, as if it had died."""
+        with self.lock:
+            for worker in self.workers:
+                if worker.future is future:
+                    worker.kill()
+
+    def kill_all(self):
+        """Kill all workers, and any processes they started"""
+        with self.lock:
+            self.shutting_down = True
+            for worker in self.workers:
+                worker.kill()
+
+    def shutdown(self):
+        """Stop all worker processes once they finish their current task"""
+        with self.lock:
+            self.shutting_down = True
+            if self.listener is not None:
+                self.listener.close()
+            workers = list(self.workers)
+            for worker in workers:
+                worker.stop()
+        for worker in workers:
+            worker.join()
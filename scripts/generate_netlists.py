@@ -0,0 +1,25 @@
+""" Generate synthetic netlist pairs (a golden netlist of Xilinx primitives, and the same netlist
+reordered and renamed, as if reversed from a bitstream) for scaling benchmarks """
+from argparse import ArgumentParser
+import pathlib
+
+from bfasst.bench.synthetic import generate_netlist_pair
+
+
+def main(directory, cell_counts, seed=0):
+    """Write a netlist pair with each number of cells to directory"""
+    directory.mkdir(parents=True, exist_ok=True)
+    for num_cells in cell_counts:
+        pair = generate_netlist_pair(directory, num_cells, seed)
+        print(f"Wrote {pair.golden_netlist} and {pair.reversed_netlist}")
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument("directory", type=pathlib.Path, help="Directory to write the netlists to")
+    parser.add_argument(
+        "cells", type=int, nargs="+", help="Number of cells of each netlist pair (eg. 1000 100000)"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the generated netlists")
+    args = parser.parse_args()
+    main(args.directory, args.cells, args.seed)
@@ -0,0 +1,44 @@
+""" Merge the profiles written by run_experiment.py --profile across all designs of an
+experiment, and print the functions that took the most time """
+from argparse import ArgumentParser
+import pathlib
+import sys
+
+from bfasst.profiling import PROFILE_SUFFIX, merge_profiles
+
+
+def main(experiment_dir, method=None, output=None, sort="cumulative", limit=40):
+    """Merge the profiles (of the tool method, or of all methods) in an experiment's work
+    directory"""
+    pattern = f"{method or '*'}{PROFILE_SUFFIX}"
+    paths = sorted(experiment_dir.rglob(pattern))
+    if not paths:
+        print(f"No profiles ({pattern}) in {experiment_dir}")
+        sys.exit(1)
+    print(f"Merging {len(paths)} profiles")
+
+    stats = merge_profiles(paths)
+    if output:
+        stats.dump_stats(output)
+    stats.sort_stats(sort).print_stats(limit)
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "experiment_dir", type=pathlib.Path, help="Experiment work directory (eg. build/<name>)"
+    )
+    parser.add_argument(
+        "--method",
+        help="Only merge the profiles of this tool method (eg. compare_netlists)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="FILE",
+        help="Write the merged profile to FILE, eg. to view with snakeviz",
+    )
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key (default cumulative)")
+    parser.add_argument("--limit", type=int, default=40, help="Number of functions to print")
+    args = parser.parse_args()
+    main(args.experiment_dir, args.method, args.output, args.sort, args.limit)
@@ -0,0 +1,133 @@
+""" Benchmark bfasst's own netlist processing stages on committed netlists, without any of the
+vendor tools (Vivado, fasm2bels, Conformal) """
+from argparse import ArgumentParser
+import pathlib
+import sys
+import tempfile
+
+from bfasst.bench.fixtures import NETLIST_EXAMPLES_PATH, find_netlist_pairs
+from bfasst.bench.runner import load_results, regressions, run_stage, save_results
+from bfasst.bench.stages import RAPIDWRIGHT_STAGES, STAGES
+from bfasst.bench.synthetic import generate_netlist_pair
+from bfasst.utils import TermColor, print_color
+
+
+def main(pairs, stages, *, repeat=5, seed=0, save=None, baseline=None, tolerance=0.1):
+    """Run the stages on each netlist pair, and print how they compare with the baseline"""
+    baseline_results = load_results(baseline) if baseline else {}
+
+    print(
+        f"{'Fixture':<16}{'Stage':<20}{'Wall (ms)':>12}{'CPU (ms)':>12}{'Alloc (KB)':>12}"
+        "  vs. baseline"
+    )
+    print("-" * 100)
+    results = []
+    failed = False
+    for pair in pairs:
+        for stage in stages:
+            result = run_stage(stage, pair, seed, repeat)
+            results.append(result)
+            if not report(result, baseline_results.get(result.key), tolerance):
+                failed = True
+
+    if save:
+        save_results(results, save)
+    if failed:
+        sys.exit(1)
+
+
+def report(result, baseline_result, tolerance):
+    """Print a stage's result, and how it compares with the baseline.  Returns False if the
+    stage failed, or regressed from the baseline."""
+    line = f"{result.fixture[:15]:<16}{result.stage:<20}"
+    if result.skipped:
+        print_color(TermColor.YELLOW, line + result.status)
+        return True
+    if result.status:
+        print_color(TermColor.RED, line + result.status.strip())
+        return False
+    line += f"{result.wall * 1000:>12.1f}{result.cpu * 1000:>12.1f}{result.peak_alloc_kb:>12.0f}  "
+
+    if baseline_result is None or baseline_result.status:
+        print(line)
+        return True
+    line += (
+        f"wall {change(result, baseline_result, 'wall'):+.0%}, "
+        f"alloc {change(result, baseline_result, 'peak_alloc_kb'):+.0%}"
+    )
+    if regressions(result, baseline_result, tolerance):
+        print_color(TermColor.RED, line)
+        return False
+    print(line)
+    return True
+
+
+def change(result, baseline_result, measurement):
+    """Change in a measurement, as a fraction of the baseline"""
+    base = getattr(baseline_result, measurement)
+    if not base:
+        return 0
+    return getattr(result, measurement) / base - 1
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--fixtures",
+        type=pathlib.Path,
+        default=NETLIST_EXAMPLES_PATH,
+        help="Directory of netlist pairs, named <name>_impl.v (or <name>_physical.v) and"
+        " <name>_reversed.v",
+    )
+    parser.add_argument(
+        "--synthetic",
+        metavar="CELLS",
+        type=int,
+        nargs="+",
+        help="Run on generated netlist pairs with these numbers of cells, instead of --fixtures",
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=list(STAGES), help="Stages to run"
+    )
+    parser.add_argument(
+        "--no-rapidwright", action="store_true", help="Skip the stages that need RapidWright"
+    )
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="Times to run each stage")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the stages' random choices")
+    parser.add_argument("--save", metavar="FILE", help="Save the results to FILE (json)")
+    parser.add_argument(
+        "--baseline",
+        metavar="FILE",
+        help="Compare with results saved by --save, failing if a stage is slower or allocates"
+        " more than the baseline by more than --tolerance",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Allowed regression from the baseline, as a fraction (default 0.1)",
+    )
+    args = parser.parse_args()
+    selected_stages = args.stages
+    if args.no_rapidwright:
+        selected_stages = [stage for stage in selected_stages if stage not in RAPIDWRIGHT_STAGES]
+    with tempfile.TemporaryDirectory(prefix="bfasst_bench_") as synthetic_dir:
+        if args.synthetic:
+            netlist_pairs = [
+                generate_netlist_pair(pathlib.Path(synthetic_dir), num_cells, args.seed)
+                for num_cells in args.synthetic
+            ]
+        else:
+            netlist_pairs = find_netlist_pairs(args.fixtures)
+        if not netlist_pairs:
+            print(f"No netlist pairs (<name>_impl.v and <name>_reversed.v) in {args.fixtures}")
+            sys.exit(1)
+        main(
+            netlist_pairs,
+            selected_stages,
+            repeat=args.repeat,
+            seed=args.seed,
+            save=args.save,
+            baseline=args.baseline,
+            tolerance=args.tolerance,
+        )
@@ -7,6 +7,7 @@ from pathlib import Path
 from bfasst.design import Design
 from bfasst import paths
 from bfasst.flows.flow import get_flow, get_flows
+from bfasst.job import run_job_function
 from bfasst.tool import BfasstException
 from bfasst.types import ToolType
 
@@ -35,7 +36,7 @@ def run_design(design_path, flow, error_flow, flow_args):
         for job in jobs:
             if not job.dependencies:
                 try:
-                    job.function()
+                    run_job_function(job.function)
                     cleanup(job, jobs)
                 except BfasstException as e:
                     print(e)
@@ -1,228 +1,257 @@
 """ Run experiment which runs multiple designs/flows in parallel """
 from argparse import ArgumentParser
 from collections import Counter
-import datetime
-import multiprocessing
 import os
 import pathlib
 import signal
 import sys
-import traceback
-import threading
 import time
 import concurrent.futures
+from bfasst.chrome_trace import ChromeTrace
 from bfasst.experiment import Experiment
-
-from bfasst.output_cntrl import enable_proxy
-from bfasst.tool import BfasstException
+from bfasst.job import JobResult, run_job
+from bfasst.journal import Journal
+from bfasst.metrics import MetricsLog
+from bfasst.profiling import profile_path
+from bfasst.runtime_history import RuntimeHistory
+from bfasst.scheduler import Scheduler
+from bfasst.status_board import StatusBoard
+from bfasst.types import Resource
 from bfasst.utils import TermColor, print_color
+from bfasst.tool import BfasstException
+from bfasst.worker_pool import WorkerPool, get_authkey
 
 LOG_FILE_NAME = "log.txt"
 
 
-def main(experiment_yaml, num_threads, print_period=1):
+def main(
+    experiment_yaml,
+    num_threads,
+    print_period=1,
+    *,
+    resume=False,
+    listen=None,
+    trace=None,
+    status_json=None,
+    profile=None,
+):
     """Setup and run experiment as multiple processes"""
 
     # Capture Ctrl+C
     signal.signal(signal.SIGINT, signal.default_int_handler)
 
-    # enable STDOUT redirects
-    enable_proxy()
-
     # Build experiment object
     experiment = Experiment(experiment_yaml)
 
-    # Ensure one thread minimum
-    num_threads = max(1, num_threads)
+    # Ensure one thread minimum, unless jobs can be run by remote workers
+    num_threads = max(0 if listen else 1, num_threads)
 
     # Create jobs
     jobs = create_jobs(experiment)
 
-    # Create shared memory
-    statuses = multiprocessing.Manager().list()
-    running_list = multiprocessing.Manager().dict()
-    print_lock = multiprocessing.Manager().Lock()
-
     # Print number of designs
     print_color(TermColor.BLUE, f"Running {len(experiment.designs)} designs and {len(jobs)} jobs")
 
-    # set the running_list to initial starttimes
-    experiment.init_design_start_times(running_list)
-
     # Start the timer
     t_start = time.perf_counter()
     sys.stdout.write("\033[s")
 
-    # Create update process and start it
-    if print_period:
-        update_process = multiprocessing.Process(
-            target=update_runtimes_thread,
-            args=[print_lock, jobs, running_list, statuses],
-        )
-        update_process.start()
-
-    # Create a process pool executor to run the jobs
-    with concurrent.futures.ProcessPoolExecutor(
-        max_workers=num_threads, mp_context=multiprocessing.get_context("spawn")
-    ) as pool:
+    # Create a pool of worker processes to run the jobs.  Workers that run JVM jobs
+    # start the JVM up front, and are kept for the whole experiment.
+    with WorkerPool(
+        num_threads, get_num_warm_workers(experiment, jobs, num_threads)
+    ) as pool, Journal(experiment.work_dir) as journal, StatusBoard(
+        len(jobs), experiment.get_length_of_longest_design_name() + 5, print_period, status_json
+    ) as status_board:
+        if listen:
+            pool.listen(listen, get_authkey())
+        if resume:
+            journal.resume(jobs)
         try:
-            while jobs:
-                futures = []
-                for job in jobs:
-                    if not job.dependencies:
-                        future = pool.submit(
-                            run_job,
-                            print_lock,
-                            running_list,
-                            job,
-                            statuses,
-                            experiment,
-                            jobs,
-                        )
-                        futures.append(future)
-                for future in concurrent.futures.as_completed(futures):
-                    clean_jobs(jobs, future, statuses)
-
+            JobRunner(
+                pool,
+                experiment,
+                journal,
+                status_board,
+                trace=ChromeTrace(trace) if trace else None,
+                profile=profile,
+            ).run(jobs)
         except KeyboardInterrupt:
             jobs = None
+            pool.kill_all()
             os.killpg(0, signal.SIGKILL)
         # except TypeError:
         #     os.killpg(0, signal.SIGKILL)
 
-    if print_period:
-        update_process.terminate()
-        update_process.join()
-
     t_end = time.perf_counter()
 
     if experiment.post_run is not None:
         experiment.post_run(experiment.work_dir)
 
-    print_ending_stats(statuses, t_end - t_start)
+    print_ending_stats(status_board.statuses, t_end - t_start)
 
 
 def create_jobs(experiment):
     """Create and populate job container"""
     jobs = []
     for flow in experiment.flows:
-        jobs.extend(flow.create())
+        flow_jobs = flow.create()
+
+        # Jobs are created in the same order every run, so their position in
+        # the flow identifies them across runs
+        for i, job in enumerate(flow_jobs):
+            job.key = f"{job.design_rel_path}:{i}:{job.tool_name}"
+        jobs.extend(flow_jobs)
 
     return jobs
 
 
-def update_runtimes_thread(print_lock, jobs, running_list, statuses, print_period=1):
-    """This function calls print_running_list every print_period seconds
-    until all jobs are done or it is terminated. It runs in its own thread.
-    """
-    if len(jobs) == len(statuses):
-        sys.stdout.write("\r\033[K")
-        print("All done")
-        return
-    with print_lock:
-        print_running_list(running_list)
-    threading.Timer(
-        print_period, update_runtimes_thread, args=[print_lock, jobs, running_list, statuses]
-    ).start()
-
-
-def print_running_list(running_list):
-    """This function prints the list of jobs that are currently executing,
-    and how long they have been running for"""
-
-    sys.stdout.write("\r\033[K")
-    sys.stdout.write("Running: ")
-    for design_rel_path, start_time in running_list.items()[:6]:
-        sys.stdout.write(design_rel_path.name[:8] + " (")
-        sys.stdout.write(str(datetime.datetime.now() - start_time).split(".", maxsplit=1)[0])
-        sys.stdout.write(") ")
-    if len(running_list) > 6:
-        sys.stdout.write("...")
-    sys.stdout.flush()
-
-
-def run_job(print_lock, running_list, job, statuses, experiment, jobs):
-    """Run a single job and update running_list"""
-    with print_lock:
-        print_running_list(running_list)
-    # Run the job:
-    try:
-        job.function()
-        status = ""
-    except BfasstException as e:
-        status = f"{type(e).__name__}: {e}\n"
-    except AssertionError:
-        formatted_lines = traceback.format_exc().splitlines()
-        status = f"AssertionErrror: {formatted_lines[-3]}"
-
-    # print the job status
-    print_job_status(experiment, print_lock, statuses, job, status)
-
-    # check the design statuses
-    check_design_statuses(jobs, job, running_list)
-
-    return (job.uuid, status)
-
-
-def clean_jobs(jobs, future, statuses):
-    """Method to clean jobs as each job finishes"""
-
-    # read the result from the future
-    finished_job_uuid = future.result()[0]
-    status = future.result()[1]
-
-    # Get the job object associated with the finished job
-    for job in jobs:
-        if job.uuid == finished_job_uuid:
-            finished_job = job
-            break
-
-    if finished_job is None:
-        raise ValueError("Finished job not found in jobs list")
-
-    # Remove the job and return if it was successful
-    if not status:
-        jobs.remove(finished_job)
-        for job in jobs:
-            if job.dependencies is not None:
-                job.dependencies.discard(finished_job_uuid)
-        return
-
-    # If the job failed, trim that branch of the job tree
-    jobs_to_remove = []
-    clean_jobs_recursive(jobs, finished_job, jobs_to_remove, statuses)
-    for job in jobs_to_remove:
-        jobs.remove(job)
-
-
-def clean_jobs_recursive(jobs, curr_job, jobs_to_remove, statuses):
-    """Recursive helper to resolve job dependencies and remove jobs from the job list"""
-    jobs_to_remove.append(curr_job)
-    for job in jobs:
-        if curr_job.uuid in job.dependencies:
-            statuses.append("Parent job failed")
-            clean_jobs_recursive(jobs, job, jobs_to_remove, statuses)
-
-
-def print_job_status(experiment, print_lock, statuses, job, status):
-    """Print job status"""
-
-    ljust = experiment.get_length_of_longest_design_name() + 5
-    with print_lock:
-        if status != "":
-            sys.stdout.write("\r\033[K")
-            sys.stdout.write(str(job.design_rel_path.name).ljust(ljust))
-            sys.stdout.flush()
-            sys.stdout.write(str(status))
-
-    statuses.append(status)
-
-
-def check_design_statuses(jobs, curr_job, running_list):
-    for job in jobs:
-        if curr_job.design_rel_path == job.design_rel_path:
-            return
-    del running_list[curr_job.design_rel_path]
-    print_running_list(running_list)
+def get_num_warm_workers(experiment, jobs, num_threads):
+    """Number of workers that should have the JVM ready for jobs that use RapidWright"""
+    num_jvm_jobs = sum(Resource.JVM in job.resources for job in jobs)
+    jvm_capacity = experiment.resource_capacities.get(Resource.JVM, num_threads)
+    return min(num_threads, jvm_capacity, num_jvm_jobs)
+
+
+class JobRunner:
+    """Submits each job to the worker pool as soon as its last parent finishes, and
+    handles the results of jobs as they finish."""
+
+    def __init__(self, pool, experiment, journal, status_board, *, trace=None, profile=None):
+        self.pool = pool
+        self.journal = journal
+        self.status_board = status_board
+        self.trace = trace
+        # Names of the tool classes whose jobs are profiled
+        self.profile = profile or []
+        self.runtime_history = RuntimeHistory(experiment.work_dir)
+        self.metrics_log = MetricsLog(experiment.work_dir)
+        self.resource_capacities = experiment.resource_capacities
+        self.timeouts = experiment.timeouts
+        self.scheduler = None
+        self.futures = {}
+        # Future -> time by which its job must finish, for jobs with a timeout that have started
+        self.deadlines = {}
+
+    def run(self, jobs):
+        """Run all jobs.  Only as many jobs as there are workers are submitted at once, so that
+        when more jobs are ready than can run, the scheduler gets to pick the jobs on the
+        critical path whose resources are available."""
+        self.scheduler = Scheduler(jobs, self.runtime_history, self.resource_capacities)
+        try:
+            self.run_until_done()
+        finally:
+            # Saved once, including when the run is interrupted or fails
+            self.runtime_history.save()
+
+    def run_until_done(self):
+        """Submit jobs and handle their results until the scheduler has no jobs left"""
+        while not self.scheduler.done:
+            self.submit_ready_jobs()
+            if not self.futures:
+                # All ready jobs were resumed, or no (remote) workers have joined yet
+                self.pool.wait_for_workers()
+                continue
+
+            # Wait for any one job to finish (or time out), rather than the whole batch
+            finished, _ = concurrent.futures.wait(
+                self.futures,
+                timeout=self.time_until_next_deadline(),
+                return_when=concurrent.futures.FIRST_COMPLETED,
+            )
+            self.kill_timed_out_jobs()
+            for future in finished:
+                if future not in self.futures:
+                    # Already finished by timing out
+                    continue
+                job = self.futures.pop(future)
+                self.deadlines.pop(future, None)
+                try:
+                    result = future.result()
+                except BfasstException as e:
+                    # The worker running the job died
+                    result = JobResult(job.uuid, f"{type(e).__name__}: {e}\n", 0.0)
+                self.job_ran(job, result)
+
+    def submit_ready_jobs(self):
+        """Submit ready jobs to the pool.  Jobs that completed in a previous run (when resuming)
+        are finished straight away, without touching their tools."""
+        for job in self.scheduler.pop_ready_jobs(self.pool.num_workers - len(self.futures)):
+            if job.uuid in self.journal.resumable:
+                self.job_finished(job, JobResult(job.uuid, "", 0.0))
+                continue
+
+            self.journal.job_started(job)
+            self.status_board.job_started(job)
+            future = self.pool.submit(
+                run_job,
+                job.uuid,
+                job.function,
+                time.time(),
+                profile_path(job, self.profile) if self.profile else None,
+                warm=Resource.JVM in job.resources,
+            )
+            self.futures[future] = job
+
+    def get_timeout(self, job):
+        """Time limit (in seconds) for a job, by the class of its tool, or None"""
+        tool_class_name = type(job.tool).__name__ if job.tool is not None else None
+        return self.timeouts.get(tool_class_name, self.timeouts.get("default"))
+
+    def time_until_next_deadline(self):
+        """How long to wait for jobs to finish before checking for timeouts.  A job's time
+        starts when a worker starts running it, not when it's submitted."""
+        now = time.monotonic()
+        for future, job in self.futures.items():
+            timeout = self.get_timeout(job)
+            if timeout is not None and future not in self.deadlines and future.running():
+                self.deadlines[future] = now + timeout
+        waiting_to_start = any(
+            self.get_timeout(job) is not None and future not in self.deadlines
+            for future, job in self.futures.items()
+        )
+
+        timeouts = [deadline - now for deadline in self.deadlines.values()]
+        if waiting_to_start:
+            timeouts.append(1.0)
+        return max(min(timeouts), 0.0) if timeouts else None
+
+    def kill_timed_out_jobs(self):
+        """Finish jobs that have run past their timeout with a TimeoutStatus, and kill the
+        workers running them (along with any tools they started)"""
+        now = time.monotonic()
+        for future, deadline in list(self.deadlines.items()):
+            if deadline > now or future.done():
+                continue
+            del self.deadlines[future]
+            job = self.futures.pop(future)
+            self.pool.kill(future)
+
+            timeout = self.get_timeout(job)
+            status = f"TimeoutStatus: {job.tool_name} ran for more than {timeout} seconds\n"
+            result = JobResult(job.uuid, status, timeout)
+            self.job_ran(job, result)
+
+    def job_ran(self, job, result):
+        """Record the result and metrics of a job that was run (rather than resumed), then
+        finish it"""
+        self.journal.job_finished(job, result)
+        self.metrics_log.record(job, result)
+        if self.trace is not None:
+            self.trace.job_finished(job, result)
+        self.job_finished(job, result)
+
+    def job_finished(self, job, result):
+        """Report the job status and release (or trim) the jobs that depend on it"""
+        self.status_board.job_finished(job, result.status)
+
+        if not result.status:
+            self.runtime_history.record(job, result.runtime)
+
+        # If the job failed, the scheduler trims that branch of the job tree
+        jobs_removed = self.scheduler.job_finished(result.uuid, result.status)
+        if jobs_removed:
+            self.status_board.jobs_removed(jobs_removed)
 
 
 def print_ending_stats(statuses, runtime):
@@ -263,5 +292,44 @@ if __name__ == "__main__":
     parser.add_argument("experiment_yaml", type=pathlib.Path, help="Experiment yaml file.")
     parser.add_argument("-j", "--threads", type=int, default=1, help="Number of threads")
     parser.add_argument("--print_period", type=int, default=1)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip jobs that completed in a previous run and whose products are unchanged",
+    )
+    parser.add_argument(
+        "--listen",
+        metavar="ADDRESS",
+        help="Also run jobs on workers that connect to this address (host:port, or a socket"
+        " path), see scripts/run_worker.py",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Write a timeline of the jobs and their phases, by worker, to FILE (Chrome trace"
+        " format, view with https://ui.perfetto.dev)",
+    )
+    parser.add_argument(
+        "--status-json",
+        metavar="FILE",
+        help="Keep a json snapshot of the experiment's progress and running jobs in FILE",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TOOL",
+        nargs="+",
+        help="Profile (cProfile) the jobs of these tool classes (or base classes, eg."
+        " CompareTool, or 'all'), writing a .prof file named by the tool method to the tool's"
+        " work directory for each design, see scripts/merge_profiles.py",
+    )
     args = parser.parse_args()
-    main(args.experiment_yaml, args.threads, args.print_period)
+    main(
+        args.experiment_yaml,
+        args.threads,
+        args.print_period,
+        resume=args.resume,
+        listen=args.listen,
+        trace=args.trace,
+        status_json=args.status_json,
+        profile=args.profile,
+    )
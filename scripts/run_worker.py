@@ -0,0 +1,43 @@
+""" Run worker processes that join the worker pool of an experiment on another machine """
+from argparse import ArgumentParser
+import multiprocessing
+from multiprocessing.connection import wait
+import signal
+
+from bfasst.worker_pool import get_authkey, remote_worker_main
+
+
+def main(address, num_workers, num_warm_workers):
+    """Start worker processes that connect to the experiment at address, and wait for the
+    experiment to finish"""
+    authkey = get_authkey()
+    mp_context = multiprocessing.get_context("spawn")
+
+    def start_worker(warm):
+        process = mp_context.Process(target=remote_worker_main, args=(address, authkey, warm))
+        process.start()
+        return process
+
+    workers = {start_worker(i < num_warm_workers): i < num_warm_workers for i in range(num_workers)}
+    while workers:
+        wait([process.sentinel for process in workers])
+        for process, warm in list(workers.items()):
+            if process.exitcode is None:
+                continue
+            del workers[process]
+            if process.exitcode == -signal.SIGKILL:
+                # Killed for running a job past its timeout, start a replacement
+                workers[start_worker(warm)] = warm
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser()
+    parser.add_argument(
+        "address", help="Address the experiment is listening on (host:port, or a socket path)"
+    )
+    parser.add_argument("-j", "--threads", type=int, default=1, help="Number of workers")
+    parser.add_argument(
+        "--warm", type=int, default=0, help="Number of workers that start the JVM up front"
+    )
+    args = parser.parse_args()
+    main(args.address, args.threads, args.warm)